@@ -0,0 +1,123 @@
+# audio_prep.py - הכנת ההקלטה לפני הזיהוי (NumPy)
+# מפענח למונו 16kHz, מנרמל עוצמה, חותך שקט בהתחלה ובסוף (VAD לפי אנרגיה)
+# ומפצל הכתבות ארוכות למקטעי דיבור - פחות נתונים לשלוח ופחות זמן זיהוי.
+import io
+import wave
+
+import numpy as np
+
+RATE = 16000
+FRAME_MS = 30
+
+
+# --- פענוח וקידוד ---
+def decode(audio_bytes):
+    # מחזיר (דגימות float32 מונו בטווח [-1, 1], קצב דגימה)
+    if audio_bytes[:4] != b"RIFF": return _decode_ffmpeg(audio_bytes), RATE
+    with wave.open(io.BytesIO(audio_bytes)) as w:
+        rate, channels, width = w.getframerate(), w.getnchannels(), w.getsampwidth()
+        raw = w.readframes(w.getnframes())
+    if width == 1: x = (np.frombuffer(raw, np.uint8).astype(np.float32) - 128) / 128
+    elif width == 2: x = np.frombuffer(raw, "<i2").astype(np.float32) / 32768
+    elif width == 4: x = np.frombuffer(raw, "<i4").astype(np.float32) / 2147483648
+    else: raise ValueError(f"רוחב דגימה לא נתמך: {width}")
+    if channels > 1: x = x.reshape(-1, channels).mean(axis=1)
+    return x, rate
+
+
+def _decode_ffmpeg(audio_bytes):
+    # webm/ogg וכו' (ברירת המחדל של mic_recorder) - דרך ffmpeg ישירות ל-16kHz מונו
+    import ffmpeg
+    out, _ = (ffmpeg.input("pipe:").output("pipe:", format="s16le", ac=1, ar=RATE)
+              .run(input=audio_bytes, capture_stdout=True, capture_stderr=True))
+    return np.frombuffer(out, "<i2").astype(np.float32) / 32768
+
+
+def encode(x, rate=RATE):
+    pcm = (np.clip(x, -1, 1) * 32767).astype("<i2")
+    buf = io.BytesIO()
+    with wave.open(buf, "wb") as w:
+        w.setnchannels(1); w.setsampwidth(2); w.setframerate(rate)
+        w.writeframes(pcm.tobytes())
+    return buf.getvalue()
+
+
+# --- עיבוד ---
+def resample(x, rate, target=RATE):
+    if rate == target or not len(x): return x
+    if target < rate:
+        # מסנן low-pass (sinc עם חלון) לפני ההורדה, למניעת aliasing
+        cutoff = 0.5 * target / rate
+        n = np.arange(-32, 33)
+        taps = 2 * cutoff * np.sinc(2 * cutoff * n) * np.hamming(len(n))
+        x = np.convolve(x, taps / taps.sum(), mode="same")
+    t = np.arange(int(len(x) * target / rate)) * (rate / target)
+    return np.interp(t, np.arange(len(x)), x).astype(np.float32)
+
+
+def normalize(x, peak=0.9, max_gain=20.0):
+    m = np.abs(x).max() if len(x) else 0
+    if m == 0: return x
+    return (x * min(peak / m, max_gain)).astype(np.float32)
+
+
+def speech_mask(x, rate=RATE, margin_db=12.0, floor_db=-50.0, hangover=8):
+    # VAD לפי אנרגיה: מסגרת היא דיבור אם היא חזקה ברמה מסוימת מרעש הרקע
+    # (האחוזון ה-10 של האנרגיה). hangover מרחיב כל קטע דיבור כדי לא לקטוע סופי מילים
+    frame = rate * FRAME_MS // 1000
+    n = len(x) // frame
+    if n == 0: return np.zeros(0, bool), frame
+    energy = 10 * np.log10((x[:n * frame].reshape(n, frame) ** 2).mean(axis=1) + 1e-10)
+    threshold = max(np.percentile(energy, 10) + margin_db, floor_db)
+    mask = energy > threshold
+    if hangover: mask = np.convolve(mask, np.ones(2 * hangover + 1), mode="same") > 0
+    return mask, frame
+
+
+def has_sound(x, floor_db=-50.0):
+    # סף מוחלט: יש בהקלטה משהו מעל שקט דיגיטלי. speech_mask משווה לרעש של ההקלטה עצמה,
+    # אז דיבור רציף בלי הפסקות או דיבור בחדר רועש יוצאים אצלו "בלי דיבור"
+    return bool(len(x)) and 10 * np.log10((x ** 2).mean() + 1e-10) > floor_db
+
+
+def trim_silence(x, rate=RATE):
+    mask, frame = speech_mask(x, rate)
+    idx = np.flatnonzero(mask)
+    if not len(idx): return x[:0]
+    return x[idx[0] * frame:(idx[-1] + 1) * frame]
+
+
+def split_utterances(x, rate=RATE, min_gap=0.6, max_len=30.0):
+    # מקטעי דיבור שמופרדים בשקט של min_gap שניות לפחות, כל מקטע עד max_len שניות
+    mask, frame = speech_mask(x, rate)
+    if not mask.any(): return []
+    edges = np.flatnonzero(np.diff(np.concatenate(([0], mask.astype(np.int8), [0]))))
+    starts, ends = edges[::2], edges[1::2]
+    gap = int(min_gap * 1000 / FRAME_MS)
+    longest = int(max_len * 1000 / FRAME_MS)
+    chunks = []
+    s, e = starts[0], ends[0]
+    for s2, e2 in zip(starts[1:], ends[1:]):
+        if s2 - e < gap and e2 - s <= longest: e = e2
+        else: chunks.append((s, e)); s, e = s2, e2
+    chunks.append((s, e))
+    out = []
+    for s, e in chunks: # מקטע דיבור רציף ארוך מדי נחתך לחתיכות של max_len
+        for a in range(s, e, longest): out.append(x[a * frame:min(e, a + longest) * frame])
+    return out
+
+
+def preprocess(audio_bytes, split=False, max_len=30.0):
+    # WAV מוכן לזיהוי (או רשימת מקטעים כש-split=True). הקלטה שקטה לגמרי מחזירה None/[].
+    # כשה-VAD לא מצא דיבור אבל יש קול - נשלחת ההקלטה המנורמלת כולה (בלי חיתוך), שהזיהוי יחליט
+    x, rate = decode(audio_bytes)
+    x = normalize(resample(x, rate))
+    if split:
+        chunks = split_utterances(x, max_len=max_len)
+        if not chunks and has_sound(x):
+            n = int(max_len * RATE)
+            chunks = [x[i:i + n] for i in range(0, len(x), n)]
+        return [encode(c) for c in chunks]
+    y = trim_silence(x)
+    if not len(y) and has_sound(x): y = x
+    return encode(y) if len(y) else None
@@ -1,11 +1,21 @@
 # backend.py - המוח והלוגיקה
-import speech_recognition as sr
-from PIL import Image, ImageDraw
+# ייבוא מהיר: ספריות כבדות (PIL, NumPy, זיהוי דיבור) נטענות רק בשימוש הראשון,
+# ושום דבר לא נכתב לדיסק בזמן import (bench.py --imports מציג את זמני הייבוא)
 import json
 import os
 import io
 import base64
+import hashlib
 import datetime
+import functools
+import threading
+import importlib.util
+import matcher
+import fuzzy
+import store
+import transcription
+import datacache
+import metrics
 
 # נסיון לייבא את המילון הרפואי
 try:
@@ -16,13 +26,16 @@ except ImportError:
 
 # --- הגדרות ---
 COORDS_FILE = "body_coords.json"
-DB_FILE = "clinic_data.json"
-IMAGES_DIR = "therapist_images"
-
-if not os.path.exists(IMAGES_DIR): os.makedirs(IMAGES_DIR)
+DB_FILE = "clinic_data.json"  # הפורמט הישן - מועבר פעם אחת אל STORE_FILE
+STORE_FILE = "clinic.db"
+AUDIO_CACHE_FILE = "audio_cache.db"
 
 # --- ניהול נתונים ---
-def load_data():
+# עותק מפוענח אחד לכל התהליך. נטען מחדש רק כשהקובץ/ה-DB משתנים,
+# וכל סשן (כל rerun) מקבל תצוגת copy-on-write זולה מעליו.
+# מהקליניקה נטענים רק המטפלים; רשימת המטופלים היא אינדקס קל, ותיק מלא
+# נטען רק כשפותחים אותו - ונשמר במטמון משותף של התיקים האחרונים
+def _read_coords():
     coords = {
         "ראש - קדמי": [150, 40], "כתף ימין - קדמי": [95, 120], "כתף שמאל - קדמי": [205, 120],
         "ברך ימין - קדמי": [115, 460], "ברך שמאל - קדמי": [185, 460], "גב תחתון": [450, 240]
@@ -33,20 +46,147 @@ def load_data():
     if os.path.exists(COORDS_FILE):
         try: coords.update(json.load(open(COORDS_FILE, "r")))
         except: pass
-    
-    db = {"דניאל": {"profile": {"gender": "Male"}, "patients": {}}}
-    if os.path.exists(DB_FILE):
-        try: db = json.load(open(DB_FILE, "r", encoding="utf-8"))
-        except: pass
-    return coords, db
+    return coords
+
+_coords_memo = datacache.Memo(_read_coords, name="coords")
+_records = datacache.LRUCache(maxsize=256, name="patients")
+PAGE_SIZE = 50
+
+def _load_clinic():
+    s = get_store()
+    _records.clear()  # ה-DB השתנה מבחוץ - התיקים שבמטמון כבר לא עדכניים
+    return {name: {"profile": profile, "patients": datacache.LazyMapping(
+                lambda name=name: [r[0] for r in s.patient_index(name)],
+                lambda patient, name=name: _pending_or_load(name, patient), _records, ns=name)}
+            for name, profile in s.therapists().items()}
+
+def _pending_or_load(therapist, patient):
+    # תיק שעוד מחכה לכתיבה ברקע עדכני יותר ממה שבדיסק
+    p = _writer.pending(("p", therapist, patient))
+    return p if p is not None else get_store().load_patient(therapist, patient)
+
+_db_memo = datacache.Memo(_load_clinic, name="clinic_db")
+
+@metrics.timed()
+def load_data():
+    coords = _coords_memo.get(datacache.file_sig(COORDS_FILE))
+    s = get_store()
+    db = _db_memo.get(s.version())
+    if not db: db = {"דניאל": {"profile": {"gender": "Male"}, "patients": {}}}
+    return dict(coords), datacache.CowDict(db)
+
+_store = None
+_store_lock = threading.Lock()
+
+def get_store():
+    # חיבור אחד לכל התהליך. בהפעלה הראשונה מעביר את clinic_data.json הישן אל SQLite
+    global _store
+    with _store_lock:
+        if _store is None:
+            s = store.Store(STORE_FILE, merge=merge_patient)
+            if s.is_empty() and os.path.exists(DB_FILE):
+                try: s.save(json.load(open(DB_FILE, "r", encoding="utf-8")))
+                except ValueError: pass
+            _store = s
+    return _store
+
+def _touched_only(db):
+    # מתוך תצוגת copy-on-write - רק המטופלים שנערכו בסשן הזה (בלי לעבור על כל הקליניקה)
+    if not isinstance(db, datacache.CowDict): return db
+    out = {}
+    for therapist, t_data in db.touched_items():
+        patients = t_data.get("patients") or {}
+        if isinstance(patients, datacache.CowDict): patients = dict(patients.touched_items())
+        out[therapist] = {"profile": t_data.get("profile", {}), "patients": patients}
+    return out
+
+def merge_patient(base, mine, theirs):
+    # מיזוג תלת-כיווני של תיק (store.merge_records), ואחריו בנייה מחדש של מחרוזות
+    # התצוגה לשדות שהממצאים שלהם מוזגו משני הצדדים
+    p, conflicts = store.merge_records(base, mine, theirs)
+    findings, anl = p.get("findings") or {}, p.setdefault("fields", {})
+    for k in findings:
+        if f"fields.{k}" in conflicts:
+            anl[k] = " | ".join(f["v"] for f in findings[k].values())
+            conflicts.remove(f"fields.{k}")
+    return p, conflicts
 
+@metrics.timed()
 def save_db(db):
-    with open(DB_FILE, "w", encoding="utf-8") as f:
-        json.dump(db, f, indent=4, ensure_ascii=False)
+    # מעדכן מיד את העותק המשותף (כל הסשנים רואים את השינוי) ומסמן את המטופלים שנערכו
+    # לכתיבה ברקע - כמה שמירות קרובות נכתבות יחד בטרנזקציה אחת. מטופל/מטפל חדש נכתב
+    # מיד, כדי שיופיע ברשימות שנקראות מה-DB.
+    # אם סשן אחר שמר את אותו מטופל מאז שהסשן הזה קרא אותו, השינויים ממוזגים לפי שדה.
+    # מחזיר [(מטפל, שם, [שדות])] - שדות ששני הסשנים שינו אחרת (נשמרה הגרסה מהסשן הזה)
+    changed_db = _touched_only(db)
+    conflicts, created = [], False
+    with _db_memo.lock:
+        base = _db_memo.get(get_store().version())
+        for therapist, t_data in changed_db.items():
+            created |= therapist not in base
+            b = base.setdefault(therapist, {"patients": {}})
+            b["profile"] = datacache.unwrap(t_data.get("profile", {}))
+            _writer.mark(("t", therapist), b["profile"])
+            for name, rec in t_data["patients"].items():
+                p = datacache.unwrap(rec)
+                seen = rec.base if isinstance(rec, datacache.CowDict) else None
+                current = b["patients"].get(name)
+                created |= current is None
+                if current is not None and current is not seen:
+                    p, keys = merge_patient(datacache.unwrap(seen) if seen is not None else {}, p, current)
+                    if keys: conflicts.append((therapist, name, keys))
+                b["patients"][name] = p
+                _writer.mark(("p", therapist, name), p)
+        if created: _writer.flush()
+    if conflicts: metrics.count("save_conflicts", len(conflicts))
+    return conflicts
+
+def _write_behind(marked, appended):
+    # רץ ברקע (או ב-flush_saves): כל מה שנצבר נכתב בטרנזקציה אחת, ואחריו התמלולים
+    s = get_store()
+    db, merged = {}, {}
+    for key, v in marked.items():
+        t_data = db.setdefault(key[1], {"patients": {}})
+        if key[0] == "t": t_data["profile"] = v
+        else: t_data["patients"][key[2]] = v
+    fresh = _db_memo.loaded and _db_memo.key == s.version()
+    s.save(db, merged)
+    while appended:
+        try: s.add_utterance(*appended[0])
+        except KeyError: metrics.count("orphan_utterances")  # המטופל נמחק בינתיים
+        del appended[0]
+    if not fresh: _db_memo.invalidate(); return
+    # תהליך אחר כתב את אותם מטופלים - העותק המשותף מקבל את הגרסה הממוזגת
+    for (therapist, name), (p, keys) in merged.items():
+        _db_memo.value[therapist]["patients"][name] = p
+        if keys: metrics.count("save_conflicts")
+    _db_memo.key = s.version()
+
+_writer = datacache.WriteBehind(_write_behind, delay=float(os.environ.get("PHYSIO_SAVE_DELAY", 0.2)),
+                                lock=_db_memo.lock, name="save")
+
+def flush_saves():
+    # כותב עכשיו את כל השמירות שממתינות (לכלים, לבדיקות ולפני יציאה)
+    _writer.flush()
+
+def patient_pages(therapist, prefix=""):
+    return max(1, -(-get_store().count_patients(therapist, prefix) // PAGE_SIZE))
+
+def patient_page(therapist, prefix="", page=1):
+    # עמוד אחד מרשימת המטופלים (הביקור האחרון קודם), עם סינון לפי תחילת השם
+    rows = get_store().patient_index(therapist, prefix, limit=PAGE_SIZE, offset=(page - 1) * PAGE_SIZE)
+    return [r[0] for r in rows]
+
+@metrics.timed()
+def search_patients(query, therapist=None, prefix="", limit=PAGE_SIZE):
+    # חיפוש מילים בתמלולים, בשדות ובאיברים (אינדקס הפוך שמתעדכן בכל שמירה).
+    # מחזיר [(מטפל, שם)] - הביקור האחרון קודם
+    _writer.flush()  # שמירות שממתינות עוד לא באינדקס
+    return get_store().search(query, therapist, prefix, limit)
 
 def save_coords(coords):
-    with open(COORDS_FILE, "w", encoding="utf-8") as f:
-        json.dump(coords, f)
+    store.atomic_write_json(COORDS_FILE, coords)
+    _render_cache.clear()  # מפות שצוירו עם הכיול הישן
 
 # --- עיבוד תמונה ואווטאר ---
 def get_image_base64(image_path):
@@ -54,20 +194,28 @@ def get_image_base64(image_path):
         with open(image_path, "rb") as f: return base64.b64encode(f.read()).decode('utf-8')
     return None
 
+@metrics.timed()
 def circular_avatar(image_path):
     b64 = get_image_base64(image_path)
     if not b64: return ""
     return f"<div style='text-align:center'><img src='data:image/png;base64,{b64}' style='width:80px;height:80px;border-radius:50%;border:2px solid #009688;'></div>"
 
 # --- ניתוח טקסט (משתמש במוח החיצוני אם קיים) ---
+@metrics.timed()
 def analyze_text(text, coords_db):
     res = {"parts": [], "pain": 0, "fields": {}}
     t = text.replace(",", "").replace(".", "")
     words = t.split()
+    # מעבר יחיד על הטקסט: נקודות הגוף + המילון הרפואי באוטומט אחד
+    m = matcher.shared_matcher(coords_db.keys())
+    ct = fuzzy.correct(t)
+    hits = m.first_hits(ct)  # שגיאות כתיב של הזיהוי ("סכרת") מתוקנות לפני ההתאמה
     
-    # 1. מיפוי גוף
+    # 1. מיפוי גוף - שמות הנקודות בחר המטפל והם לא במילון התיקון ("שמאלי" היה מתוקן
+    # ל"שמאל"), אז הם מותאמים לטקסט המקורי (מעבר שני רק אם התיקון שינה משהו)
+    part_hits = hits if ct == t else m.first_hits(t)
     for saved_part in coords_db.keys():
-        if saved_part in t: res["parts"].append(saved_part)
+        if saved_part in part_hits: res["parts"].append(saved_part)
             
     # 2. זיהוי כאב
     for w in words:
@@ -77,16 +225,13 @@ def analyze_text(text, coords_db):
 
     # 3. מילוי שדות (אם יש מוח חיצוני - משתמש בו, אחרת בסיסי)
     if HAS_MK:
-        for category, keywords in mk.MEDICAL_BRAIN.items():
-            found = []
-            for key in keywords:
-                if key in t:
-                    try: # מנסה לקחת הקשר
-                        idx = words.index(key)
-                        snippet = " ".join(words[max(0, idx-1):min(len(words), idx+5)])
-                        found.append(snippet)
-                    except: found.append(key)
-            if found: res["fields"][category] = " | ".join(list(set(found)))
+        found = {}
+        for key, hit in hits.items():
+            for kind, category, _ in m.labels[key]:
+                if kind == matcher.BRAIN: # לוקח הקשר סביב ההתאמה
+                    found.setdefault(category, set()).add(mk.snippet_at(words, hit.token, 1))
+        for category in mk.MEDICAL_BRAIN:
+            if category in found: res["fields"][category] = " | ".join(found[category])
     
     # ברירת מחדל אם לא זוהה כלום
     if not res["fields"] and t:
@@ -94,13 +239,84 @@ def analyze_text(text, coords_db):
         
     return res
 
+# --- החלת תמלול על תיק ---
+# כל שדה נשמר כאוסף ממצאים בלי כפילויות: findings[שדה][מפתח_מנורמל] = {v, session, ts, n}.
+# בדיקת "כבר קיים?" היא חיפוש במילון, ומחרוזת התצוגה (fields[שדה]) נבנית מחדש
+# רק לשדות שנוסף להם ממצא חדש - כך עלות המיזוג וגודל הרשומה לא גדלים עם ההיסטוריה
+def normalize_finding(snippet):
+    # מנקה רווחים וחזרות רצופות ("כואב לי כואב לי כואב לי" -> "כואב לי")
+    words = snippet.split()
+    for n in (3, 2, 1):
+        out = []
+        for w in words:
+            out.append(w)
+            if len(out) >= 2 * n and out[-n:] == out[-2 * n:-n]: del out[-n:]
+        words = out
+    return " ".join(words)
+
+def _merge_findings(findings, field, snippets, session, ts):
+    bucket = findings.setdefault(field, {})
+    added = False
+    for snip in snippets:
+        key = normalize_finding(snip)
+        if not key: continue
+        if key in bucket: bucket[key]["n"] += 1; bucket[key]["ts"] = ts
+        else: bucket[key] = {"v": key, "session": session, "ts": ts, "n": 1}; added = True
+    return added
+
+def apply_transcript(p_data, text, res, when=None):
+    # ממזג את ניתוח ההקלטה החדשה (רק היא) לממצאי התיק
+    when = when or datetime.datetime.now()
+    session, ts = when.date().isoformat(), when.isoformat(timespec="seconds")
+    anl = p_data.setdefault("fields", {})
+    findings = p_data.setdefault("findings", {})
+    for k, v in res['fields'].items():
+        if k not in findings and anl.get(k): # שדה ישן (מחרוזת) - הופך לממצאים פעם אחת
+            _merge_findings(findings, k, str(anl[k]).split(" | "), None, None)
+            anl[k] = " | ".join(f["v"] for f in findings[k].values())
+        if _merge_findings(findings, k, v.split(" | "), session, ts):
+            anl[k] = " | ".join(f["v"] for f in findings[k].values())
+    
+    if res.get('parts'): p_data["parts"] = res['parts']
+    if res['pain'] > 0: anl["pain"] = res['pain']
+
+def add_utterance(therapist, patient, text, when=None):
+    # התמלול נשמר כשורה נפרדת לכל הקלטה (לא כמחרוזת שגדלה בתוך הרשומה)
+    # נכתב ברקע יחד עם השמירה שלפניו (אחרי רשומת המטופל)
+    when = when or datetime.datetime.now()
+    _writer.append((therapist, patient, text, when.isoformat(timespec="seconds")))
+
+def transcript(therapist, patient):
+    # מה שבדיסק ואחריו הקלטות שעוד ממתינות לכתיבה
+    pending = [u[2] for u in _writer.appended() if u[:2] == (therapist, patient)]
+    return "\n".join([t for t in [get_store().transcript(therapist, patient)] if t] + pending)
+
 # --- ציור מפה ---
-def draw_map(gender, parts, intensity, coords_db, highlight_point=None):
+# תמונות הבסיס מפוענחות פעם אחת לכל התהליך, ומפות מוכנות נשמרות במטמון LRU
+# (יחד עם ה-PNG המקודד) לפי מין, סט האיברים, הקואורדינטות שלהם ונקודת הכיול
+_render_cache = datacache.LRUCache(maxsize=64, name="body_chart")
+
+@functools.lru_cache(maxsize=4)
+def _base_image(path):
+    from PIL import Image
+    return Image.open(path).convert("RGBA")
+
+def _render_key(gender, parts, coords_db, highlight_point):
+    drawn = frozenset(p for p in parts if p in coords_db)
+    pts = hash(tuple(sorted((p, tuple(coords_db[p][:2])) for p in drawn)))
+    return (gender, drawn, pts, tuple(highlight_point) if highlight_point else None)
+
+def _render(gender, parts, coords_db, highlight_point):
+    # מחזיר (תמונה, PNG) מהמטמון או מצייר מחדש
     path = "body_male.png" if gender == "Male" else "body_female.png"
     if not os.path.exists(path): return None
+    key = _render_key(gender, parts, coords_db, highlight_point)
+    hit = _render_cache.get(key)
+    if hit: return hit
     
     try:
-        img = Image.open(path).convert("RGBA")
+        from PIL import Image, ImageDraw
+        img = _base_image(path)
         overlay = Image.new('RGBA', img.size, (255,255,255,0))
         draw = ImageDraw.Draw(overlay)
         
@@ -115,13 +331,172 @@ def draw_map(gender, parts, intensity, coords_db, highlight_point=None):
             draw.ellipse((x-5, y-5, x+5, y+5), fill=(0,0,255,255))
             draw.ellipse((x-10, y-10, x+10, y+10), outline="blue", width=2)
             
-        return Image.alpha_composite(img, overlay)
+        out = Image.alpha_composite(img, overlay)
+        buf = io.BytesIO(); out.save(buf, format="PNG")
+        hit = (out, buf.getvalue())
+        _render_cache.put(key, hit)
+        return hit
     except: return None
 
+@metrics.timed()
+def draw_map(gender, parts, intensity, coords_db, highlight_point=None):
+    # התמונה המוחזרת משותפת דרך המטמון - לא לשנות אותה במקום
+    hit = _render(gender, parts, coords_db, highlight_point)
+    return hit[0] if hit else None
+
+@metrics.timed()
+def draw_map_png(gender, parts, intensity, coords_db, highlight_point=None):
+    # אותה מפה כ-PNG מוכן (בלי קידוד מחדש בכל rerun)
+    hit = _render(gender, parts, coords_db, highlight_point)
+    return hit[1] if hit else None
+
+# --- מפת גוף כ-SVG ---
+# במקום לצייר PNG חדש בכל החלפת מטופל: תמונת הבסיס מוגשת כקובץ סטטי (app/static/, ראו
+# .streamlit/config.toml) עם ?v=<hash> - כתובת שהדפדפן שומר לזמן ארוך - ובכל rerun נשלח
+# רק SVG קטן עם הסימונים מעליה. ברירת המחדל; PHYSIO_CHART=png חוזר לציור בשרת
+CHART_MODE = os.environ.get("PHYSIO_CHART", "svg")
+STATIC_DIR = "static"
+
+@functools.lru_cache(maxsize=8)
+def _static_image(path, sig):
+    # מעתיק את התמונה ל-static/ (פעם אחת לכל גרסה של הקובץ). מחזיר (כתובת, רוחב, גובה)
+    from PIL import Image
+    with open(path, "rb") as f: data = f.read()
+    os.makedirs(STATIC_DIR, exist_ok=True)
+    dst = os.path.join(STATIC_DIR, os.path.basename(path))
+    if datacache.file_sig(dst) is None or open(dst, "rb").read() != data:
+        tmp = f"{dst}.{os.getpid()}.tmp"
+        with open(tmp, "wb") as f: f.write(data)
+        os.replace(tmp, dst)
+    w, h = Image.open(io.BytesIO(data)).size
+    return f"app/static/{os.path.basename(path)}?v={hashlib.sha256(data).hexdigest()[:12]}", w, h
+
+@metrics.timed()
+def body_chart_html(gender, parts, coords_db, highlight_point=None):
+    # אותה מפה כמו draw_map: עיגול אדום לכל איבר, ונקודת כיול כחולה (highlight_point)
+    path = "body_male.png" if gender == "Male" else "body_female.png"
+    if not os.path.exists(path): return None
+    url, w, h = _static_image(path, datacache.file_sig(path))
+    marks = [f'<circle cx="{coords_db[p][0]}" cy="{coords_db[p][1]}" r="15" fill="rgba(255,0,0,0.7)"/>'
+             for p in dict.fromkeys(parts) if p in coords_db]
+    if highlight_point:
+        x, y = highlight_point[:2]
+        marks += [f'<circle cx="{x}" cy="{y}" r="5" fill="blue"/>',
+                  f'<circle cx="{x}" cy="{y}" r="10" fill="none" stroke="blue" stroke-width="2"/>']
+    return (f'<div style="position:relative;direction:ltr"><img src="{url}" style="width:100%;display:block">'
+            f'<svg viewBox="0 0 {w} {h}" style="position:absolute;left:0;top:0;width:100%;height:100%">'
+            f'{"".join(marks)}</svg></div>')
+
+# --- מפת חום של הקליניקה ---
+# כל המטופלים (או מטפל/טווח תאריכים) על מפת גוף אחת: כמה מטופלים בכל איבר, משוקלל
+# בציון הכאב (מטופל בלי ציון נספר כ-1). הקיבוץ נעשה ב-SQLite והציור ב-NumPy (heatmap.py),
+# והתוצאה נשמרת במטמון לפי הכיול, הסינון וגרסת ה-DB
+HAS_HEATMAP = importlib.util.find_spec("numpy") is not None
+HEAT_SIGMA = 0.05  # רוחב הכתם ביחס לרוחב התמונה
+_heatmap_cache = datacache.LRUCache(maxsize=16, name="heatmap")
+
+def pain_by_part(therapist=None, since=None, until=None):
+    # [{איבר, מטופלים, כאב ממוצע, משקל}] - משקל = סכום הכאב + מטופלים בלי ציון
+    _writer.flush()
+    rows = get_store().pain_by_part(therapist, since, until)
+    return [{"part": part, "patients": n, "avg_pain": round(total / scored, 1) if scored else None,
+             "weight": total + n - scored} for part, n, total, scored in rows]
+
+@metrics.timed()
+def draw_heatmap(coords_db, therapist=None, since=None, until=None, gender="Male"):
+    # PNG של מפת החום, או None (אין תמונת גוף / NumPy)
+    path = "body_male.png" if gender == "Male" else "body_female.png"
+    if not HAS_HEATMAP or not os.path.exists(path): return None
+    _writer.flush()
+    pts = hash(tuple(sorted((p, tuple(xy[:2])) for p, xy in coords_db.items())))
+    key = (gender, pts, therapist, since, until, get_store().version())
+    png = _heatmap_cache.get(key)
+    if png: return png
+    
+    import heatmap
+    from PIL import Image
+    rows = [r for r in pain_by_part(therapist, since, until) if r["part"] in coords_db]
+    img = _base_image(path)
+    out = img
+    if rows:
+        grid = heatmap.splat([coords_db[r["part"]][:2] for r in rows], [r["weight"] for r in rows],
+                             img.size, HEAT_SIGMA * img.size[0])
+        out = Image.alpha_composite(img, Image.fromarray(heatmap.colorize(grid), "RGBA"))
+    buf = io.BytesIO(); out.save(buf, format="PNG")
+    _heatmap_cache.put(key, buf.getvalue())
+    return buf.getvalue()
+
 # --- עיבוד אודיו ---
-def process_audio(audio_bytes):
-    r = sr.Recognizer()
-    try:
-        with sr.AudioFile(io.BytesIO(audio_bytes)) as source:
-            return r.recognize_google(r.record(source), language="he-IL")
-    except: return None
\ No newline at end of file
+# מנוע הזיהוי נבחר לפי PHYSIO_RECOGNIZER: google (ברירת מחדל) או offline (לבדיקות)
+def default_recognizer():
+    if os.environ.get("PHYSIO_RECOGNIZER") == "offline": r = transcription.OfflineRecognizer()
+    else: r = transcription.GoogleRecognizer()
+    # מנקה ומפצל את ההקלטה לפני הזיהוי (אם NumPy מותקן)
+    if transcription.HAS_PREP: r = transcription.PreprocessingRecognizer(r)
+    return r
+
+@metrics.timed()
+def process_audio(audio_bytes, recognizer=None):
+    # זיהוי סינכרוני (לכלים ולבדיקות). הדף עצמו משתמש בתור שרץ ברקע
+    try: return (recognizer or default_recognizer()).recognize(audio_bytes)
+    except transcription.TranscriptionError: return None
+
+_transcriber = None
+
+def get_transcriber():
+    # תור אחד לכל התהליך - מגביל כמה זיהויים רצים במקביל בין כל הסשנים
+    global _transcriber
+    with _store_lock:
+        if _transcriber is None:
+            _transcriber = transcription.TranscriptionQueue(
+                default_recognizer(), workers=int(os.environ.get("PHYSIO_TRANSCRIBE_WORKERS", 2)))
+    return _transcriber
+
+# --- עיבוד הקלטה פעם אחת בלבד ---
+# אותה הקלטה (למשל כש-mic_recorder מחזיר שוב את אותו payload ב-rerun) לא נשלחת
+# שוב לזיהוי ולא נכתבת שוב ל-DB: התוצאה נשמרת לפי hash של תוכן האודיו
+_audio_cache = None
+
+def get_audio_cache():
+    global _audio_cache
+    with _store_lock:
+        if _audio_cache is None: _audio_cache = store.AudioCache(AUDIO_CACHE_FILE)
+    return _audio_cache
+
+def audio_digest(audio_bytes):
+    return hashlib.sha256(audio_bytes).hexdigest()
+
+def start_transcription(audio_bytes, retry=False):
+    # שולח לתור ברקע (אם ההקלטה לא עובדה כבר) ומחזיר את מזהה העבודה = hash האודיו.
+    # הקלטה שהזיהוי שלה נכשל נשלחת שוב רק עם retry=True
+    digest = audio_digest(audio_bytes)
+    seen = get_audio_cache().get(digest) is not None
+    metrics.cache("audio", seen)
+    if not seen: get_transcriber().submit(audio_bytes, job_id=digest, retry=retry)
+    return digest
+
+def transcription_state(digest):
+    # מצב העבודה בלבד - בלי "לתפוס" את התוצאה (לבדיקות תקופתיות)
+    if get_audio_cache().get(digest): return transcription.DONE
+    job = get_transcriber().get(digest)
+    return job.state if job else None
+
+def transcription_result(digest, coords_db):
+    # מחזיר (מצב, טקסט, ניתוח, האם_חדש). האם_חדש=True רק לקורא הראשון שמקבל את
+    # התוצאה - הוא זה שמחיל אותה על התיק. מצב None = עבודה לא מוכרת (למשל אחרי הפעלה מחדש)
+    hit = get_audio_cache().get(digest)
+    if hit: return transcription.DONE, hit["text"], hit["analysis"], False
+    job = get_transcriber().get(digest)
+    if job is None: return None, None, None, False
+    if job.state != transcription.DONE or not job.text:  # בתהליך / נכשל / לא זוהו מילים
+        return job.state, None, None, False
+    res = analyze_text(job.text, coords_db)
+    is_new = get_audio_cache().put(digest, {"text": job.text, "analysis": res}, replace=False)
+    return job.state, job.text, res, is_new
+
+def transcribe_once(audio_bytes, coords_db, timeout=None):
+    # גרסה סינכרונית: מחכה לתור. מחזיר (טקסט, ניתוח, האם_חדש)
+    digest = start_transcription(audio_bytes)
+    get_transcriber().wait(digest, timeout)
+    _, text, res, is_new = transcription_result(digest, coords_db)
+    return text, res, is_new
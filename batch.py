@@ -0,0 +1,141 @@
+# batch.py - תמלול וניתוח של תיקיית הקלטות (או manifest) במקביל, משורת הפקודה
+#
+#   python batch.py recordings/ -o results.jsonl --workers 4
+#   python batch.py manifest.jsonl -o results.jsonl --import-to דניאל
+#
+# כל הקלטה נכתבת כשורת JSON ברגע שהיא מסתיימת. הרצה חוזרת עם אותו קובץ פלט
+# מדלגת על מה שכבר הצליח (המשך אחרי הפסקה). --import-to מוסיף את התוצאות לתיקים.
+import argparse
+import csv
+import json
+import os
+import sys
+from concurrent.futures import ProcessPoolExecutor, as_completed
+
+import backend as bp
+
+_coords = None
+
+
+def load_manifest(src):
+    # תיקייה: כל קבצי ה-WAV (שם המטופל = שם הקובץ).
+    # manifest: JSONL או CSV עם העמודות path ואופציונלית patient, therapist, gender
+    if os.path.isdir(src):
+        names = sorted(n for n in os.listdir(src) if n.lower().endswith(".wav"))
+        return [{"path": os.path.join(src, n), "patient": os.path.splitext(n)[0]} for n in names]
+    base = os.path.dirname(src)
+    with open(src, "r", encoding="utf-8") as f:
+        if src.lower().endswith(".csv"): rows = list(csv.DictReader(f))
+        else: rows = [json.loads(line) for line in f if line.strip()]
+    for r in rows:
+        r["path"] = os.path.join(base, r["path"])
+        r.setdefault("patient", os.path.splitext(os.path.basename(r["path"]))[0])
+    return rows
+
+
+def done_paths(out_path):
+    # הקלטות שכבר עובדו בהצלחה בהרצה קודמת
+    done = set()
+    if os.path.exists(out_path):
+        with open(out_path, "r", encoding="utf-8") as f:
+            for line in f:
+                try: r = json.loads(line)
+                except ValueError: continue  # שורה חלקית מהרצה שנקטעה
+                if not r.get("error"): done.add(r["path"])
+    return done
+
+
+def _init_worker(coords):
+    global _coords
+    _coords = coords
+
+
+def process_one(item):
+    # רץ בתהליך נפרד: זיהוי + ניתוח של הקלטה אחת
+    out = dict(item)
+    try:
+        with open(item["path"], "rb") as f: audio = f.read()
+        out["digest"] = bp.audio_digest(audio)
+        text = bp.default_recognizer().recognize(audio)
+        out["text"] = text
+        out["analysis"] = bp.analyze_text(text, _coords) if text else None
+    except Exception as e:
+        out["error"] = f"{type(e).__name__}: {e}"
+    return out
+
+
+def run(items, out_path, workers, coords):
+    # מריץ את ההקלטות ב-process pool וכותב כל תוצאה מיד (flush) לקובץ הפלט
+    failed = 0
+    with open(out_path, "a", encoding="utf-8") as out, \
+            ProcessPoolExecutor(max_workers=workers, initializer=_init_worker, initargs=(coords,)) as pool:
+        futures = [pool.submit(process_one, item) for item in items]
+        for i, fut in enumerate(as_completed(futures), 1):
+            r = fut.result()
+            out.write(json.dumps(r, ensure_ascii=False) + "\n"); out.flush()
+            failed += bool(r.get("error"))
+            status = "❌ " + r["error"] if r.get("error") else "✅"
+            print(f"[{i}/{len(futures)}] {status} {r['path']}", file=sys.stderr)
+    return failed
+
+
+def import_results(out_path, therapist):
+    # מוסיף לתיקים את כל התוצאות שבקובץ הפלט, בטרנזקציה אחת. כל הקלטה מוחלת פעם אחת בלבד
+    # (אותו מנגנון כמו בדף: "תפיסה" של ה-hash במטמון האודיו). התפיסה נכתבת רק אחרי
+    # שהשמירה הצליחה - שמירה שנכשלה לא משאירה הקלטות תפוסות, והרצה חוזרת מנסה אותן שוב.
+    # מחזיר (כמה נוספו, {סיבה: כמה דולגו})
+    coords, db = bp.load_data()
+    cache = bp.get_audio_cache()
+    added, skipped, digests = [], {}, set()
+    with open(out_path, "r", encoding="utf-8") as f:
+        for line in f:
+            try: r = json.loads(line)
+            except ValueError: continue
+            if r.get("error"): continue  # דווח כבר בהרצה
+            reason = ("לא זוהו מילים" if not r.get("text") else
+                      "כבר הוחלה (בדף או בהרצה קודמת)" if cache.get(r["digest"]) is not None else
+                      "קובץ אודיו זהה להקלטה אחרת בקובץ" if r["digest"] in digests else None)
+            if reason:
+                skipped[reason] = skipped.get(reason, 0) + 1
+                continue
+            digests.add(r["digest"])
+            th = r.get("therapist") or therapist
+            t_data = db.setdefault(th, {"profile": {"gender": "Male"}, "patients": {}})
+            patients = t_data.setdefault("patients", {})
+            if r["patient"] not in patients:
+                patients[r["patient"]] = {"gender": r.get("gender") or "Male", "fields": {}}
+            bp.apply_transcript(patients[r["patient"]], r["text"], r["analysis"])
+            added.append((th, r["patient"], r["text"], r["digest"], r["analysis"]))
+    if added: bp.save_db(db)
+    for th, patient, text, *_ in added: bp.add_utterance(th, patient, text)
+    bp.flush_saves()
+    for *_, text, digest, analysis in added:
+        cache.put(digest, {"text": text, "analysis": analysis}, replace=False)
+    return len(added), skipped
+
+
+def main(argv=None):
+    ap = argparse.ArgumentParser(description="תמלול וניתוח הקלטות במקביל")
+    ap.add_argument("src", help="תיקיית WAV או manifest (jsonl/csv)")
+    ap.add_argument("-o", "--out", default="batch_results.jsonl", help="קובץ JSONL לתוצאות")
+    ap.add_argument("-w", "--workers", type=int, default=os.cpu_count())
+    ap.add_argument("--no-resume", action="store_true", help="לעבד מחדש גם הקלטות שכבר הצליחו")
+    ap.add_argument("--import-to", metavar="THERAPIST", help="להוסיף את התוצאות לתיקי המטופלים של המטפל")
+    args = ap.parse_args(argv)
+
+    items = load_manifest(args.src)
+    if not args.no_resume:
+        done = done_paths(args.out)
+        items = [it for it in items if it["path"] not in done]
+    print(f"{len(items)} הקלטות לעיבוד", file=sys.stderr)
+    coords, _ = bp.load_data()
+    if items and run(items, args.out, args.workers, coords):
+        print("חלק מההקלטות נכשלו - הרצה חוזרת תנסה אותן שוב", file=sys.stderr)
+    if args.import_to:
+        n, skipped = import_results(args.out, args.import_to)
+        print(f"נוספו {n} הקלטות לתיקים", file=sys.stderr)
+        for reason, count in skipped.items(): print(f"דולגו {count}: {reason}", file=sys.stderr)
+
+
+if __name__ == "__main__":
+    main()
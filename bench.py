@@ -0,0 +1,215 @@
+# bench.py - מדידת ביצועים: ניתוח טקסט, אחסון, ציור מפה, אווטאר ואודיו
+#
+#   python bench.py -o bench.json                       # מריץ ושומר תוצאות
+#   python bench.py --baseline bench.json --tolerance 0.25   # נכשל (exit 1) אם משהו הואט ביותר מ-25%
+#   python bench.py --quick                             # בלי הקליניקה של 50 אלף מטופלים
+#   python bench.py --imports                           # דו"ח זמני ייבוא של backend (python -X importtime)
+#
+# הנתונים סינתטיים ודטרמיניסטיים (seed קבוע), והכל רץ בתיקייה זמנית -
+# קבצי הקליניקה האמיתיים לא נוגעים.
+import argparse
+import json
+import os
+import random
+import shutil
+import statistics
+import subprocess
+import sys
+import tempfile
+import time
+
+HERE = os.path.dirname(os.path.abspath(__file__))
+sys.path.insert(0, HERE)
+
+import medical_knowledge as mk
+import medical_brain as mb
+
+FILLER = ["אני", "מרגיש", "אתמול", "קצת", "הרבה", "כשאני", "אבל", "גם", "היום", "בערב", "שלי", "ממש"]
+TEXT_WORDS = [50, 500, 5000]
+CLINIC_SIZES = [10, 1000, 50000]
+
+
+def synthetic_text(n_words, rng):
+    vocab = [k for ks in mk.MEDICAL_BRAIN.values() for k in ks]
+    vocab += [s for c in mb.KNOWLEDGE_BASE.values() for ss in c.values() for s in ss]
+    vocab += list(mk.DEFAULT_BODY_COORDS) + [str(i) for i in range(11)]
+    words = []
+    while len(words) < n_words:
+        words += (rng.choice(vocab) if rng.random() < 0.3 else rng.choice(FILLER)).split()
+    return " ".join(words[:n_words])
+
+
+def synthetic_clinic(n_patients, rng, therapists=5):
+    db = {f"מטפל {t}": {"profile": {"gender": "Male"}, "patients": {}} for t in range(therapists)}
+    names = list(db)
+    for i in range(n_patients):
+        fields = {k: synthetic_text(rng.randint(3, 12), rng) for k in rng.sample(list(mk.MEDICAL_BRAIN), 3)}
+        fields["pain"] = rng.randint(0, 10)
+        db[names[i % therapists]]["patients"][f"מטופל {i}"] = {
+            "gender": rng.choice(["Male", "Female"]), "text": synthetic_text(rng.randint(20, 200), rng),
+            "fields": fields, "parts": rng.sample(list(mk.DEFAULT_BODY_COORDS), 2)}
+    return db
+
+
+def timeit(fn, repeat=5, setup=None):
+    times = []
+    for _ in range(repeat):
+        if setup: setup()
+        t = time.perf_counter()
+        fn()
+        times.append(time.perf_counter() - t)
+    return {"median": statistics.median(times), "min": min(times), "n": repeat}
+
+
+def fresh_backend(bp):
+    # מאפס את המטמונים של backend - כמו הפעלה ראשונה של השרת
+    bp.flush_saves()
+    if bp._store: bp._store.close()
+    bp._store = None
+    bp._db_memo.invalidate()
+    bp._coords_memo.invalidate()
+    bp._render_cache.clear()
+
+
+# --- הפעלה קרה: ייבוא backend והטעינה הראשונה, כל אחד בתהליך נקי ---
+STARTUP = ("import time; t = time.perf_counter(); import backend; t1 = time.perf_counter(); "
+           "backend.load_data(); print(t1 - t, time.perf_counter() - t1)")
+
+
+def startup(repeat=5):
+    imports, first = [], []
+    for _ in range(repeat):
+        out = subprocess.run([sys.executable, "-c", STARTUP], capture_output=True, text=True, check=True,
+                             env=dict(os.environ, PYTHONPATH=HERE)).stdout.split()
+        imports.append(float(out[0])); first.append(float(out[1]))
+    pack = lambda ts: {"median": statistics.median(ts), "min": min(ts), "n": repeat}
+    return {"startup/import_backend": pack(imports), "startup/first_load_data": pack(first)}
+
+
+def import_profile(module="backend", top=15):
+    # [(מודול, זמן עצמי, זמן מצטבר)] בשניות, לפי הזמן המצטבר - מתוך python -X importtime
+    err = subprocess.run([sys.executable, "-X", "importtime", "-c", f"import {module}"], capture_output=True,
+                         text=True, check=True, cwd=HERE).stderr
+    rows = []
+    for line in err.splitlines():
+        parts = line.split("|")
+        if len(parts) != 3 or not parts[0].split(":")[-1].strip().isdigit(): continue
+        rows.append((parts[2].strip(), int(parts[0].split(":")[-1]) / 1e6, int(parts[1]) / 1e6))
+    return sorted(rows, key=lambda r: -r[2])[:top]
+
+
+def run(quick=False):
+    rng = random.Random(1234)
+    results = {}
+    work = tempfile.mkdtemp(prefix="physio_bench_")
+    cwd = os.getcwd()
+    try:
+        for f in ["body_coords.json", "body_male.png", "body_female.png", "therapist_male.png.jpeg", "temp_audio.wav"]:
+            if os.path.exists(os.path.join(HERE, f)): shutil.copy(os.path.join(HERE, f), work)
+        os.chdir(work)
+        results.update(startup())
+        import backend as bp
+        import export
+        coords, _ = bp.load_data()
+        coords = dict(coords)
+        brain = mb.MedicalBrain()
+
+        # --- ניתוח טקסט ---
+        for n in TEXT_WORDS:
+            text = synthetic_text(n, rng)
+            results[f"analyze_text/{n}w"] = timeit(lambda: bp.analyze_text(text, coords))
+            results[f"analyze_text_engine/{n}w"] = timeit(lambda: mk.analyze_text_engine(text))
+            results[f"MedicalBrain.analyze/{n}w"] = timeit(lambda: brain.analyze(text))
+
+        # --- אחסון ---
+        for n in CLINIC_SIZES:
+            if quick and n > 1000: continue
+            fresh_backend(bp)
+            for f in [bp.STORE_FILE, bp.STORE_FILE + "-wal", bp.STORE_FILE + "-shm"]:
+                if os.path.exists(f): os.remove(f)
+            clinic = synthetic_clinic(n, rng)
+            # השמירה עצמה נכתבת ברקע - המדידה כוללת את הכתיבה לדיסק (flush_saves)
+            results[f"save_db/full/{n}p"] = timeit(lambda: (bp.save_db(clinic), bp.flush_saves()), repeat=1)
+            results[f"load_data/cold/{n}p"] = timeit(bp.load_data, repeat=3, setup=lambda: fresh_backend(bp))
+            results[f"load_data/warm/{n}p"] = timeit(bp.load_data)
+
+            def edit_one():
+                _, db = bp.load_data()
+                th = next(iter(db))
+                p = db[th]["patients"][next(iter(db[th]["patients"]))]
+                bp.apply_transcript(p, "עוד משפט", {"fields": {"hpc": "עוד משפט"}, "parts": [], "pain": 0})
+                bp.save_db(db)
+                bp.flush_saves()
+            results[f"save_db/one_patient/{n}p"] = timeit(edit_one)
+            results[f"search/{n}p"] = timeit(lambda: bp.search_patients("כאב ברך", limit=50))
+            results[f"heatmap/{n}p"] = timeit(lambda: bp.draw_heatmap(coords), setup=bp._heatmap_cache.clear)
+            results[f"export/{n}p"] = timeit(lambda: export.export("export_out"), repeat=1)
+            results[f"reports/{n}p"] = timeit(export.reports, repeat=1)
+
+        # --- ציור מפה ואווטאר ---
+        parts = list(coords)[:4]
+        for g in ["Male", "Female"]:
+            results[f"draw_map/cold/{g}"] = timeit(lambda: bp.draw_map(g, parts, 5, coords),
+                                                   setup=lambda: (bp._render_cache.clear(), bp._base_image.cache_clear()))
+            results[f"draw_map/warm/{g}"] = timeit(lambda: bp.draw_map(g, parts, 5, coords))
+            results[f"body_chart_svg/{g}"] = timeit(lambda: bp.body_chart_html(g, parts, coords))
+        results["circular_avatar"] = timeit(lambda: bp.circular_avatar("therapist_male.png.jpeg"))
+
+        # --- אודיו (מנוע זיהוי מקומי - בלי רשת) ---
+        if os.path.exists("temp_audio.wav"):
+            import transcription
+            audio = open("temp_audio.wav", "rb").read()
+            r = transcription.OfflineRecognizer()
+            if transcription.HAS_PREP: r = transcription.PreprocessingRecognizer(r)
+            results["process_audio/temp_audio.wav"] = timeit(lambda: bp.process_audio(audio, r))
+        fresh_backend(bp)
+    finally:
+        os.chdir(cwd)
+        shutil.rmtree(work, ignore_errors=True)
+    return results
+
+
+def compare(results, baseline, tolerance):
+    # מחזיר את רשימת המדידות שהואטו יותר מ-tolerance יחסית ל-baseline (לפי החציון)
+    regressions = []
+    for name, r in sorted(results.items()):
+        old = baseline.get(name)
+        if not old: continue
+        ratio = r["median"] / old["median"] if old["median"] else 1.0
+        flag = "⚠️" if ratio > 1 + tolerance else "  "
+        print(f"{flag} {name:40s} {old['median'] * 1000:10.3f}ms -> {r['median'] * 1000:10.3f}ms  x{ratio:.2f}")
+        if ratio > 1 + tolerance: regressions.append(name)
+    return regressions
+
+
+def main(argv=None):
+    ap = argparse.ArgumentParser(description="מדידת ביצועים")
+    ap.add_argument("-o", "--out", default="bench_results.json")
+    ap.add_argument("--baseline", help="קובץ תוצאות קודם להשוואה")
+    ap.add_argument("--tolerance", type=float, default=0.25, help="האטה מותרת (0.25 = 25%%)")
+    ap.add_argument("--quick", action="store_true", help="בלי הקליניקה הגדולה")
+    ap.add_argument("--imports", action="store_true", help="רק דו\"ח זמני ייבוא של backend")
+    args = ap.parse_args(argv)
+
+    if args.imports:
+        for name, self_t, cum in import_profile():
+            print(f"{name:40s} {cum * 1000:10.1f}ms  (עצמי {self_t * 1000:.1f}ms)")
+        return 0
+
+    results = run(quick=args.quick)
+    with open(args.out, "w", encoding="utf-8") as f:
+        json.dump(results, f, indent=2, ensure_ascii=False, sort_keys=True)
+    if not args.baseline:
+        for name, r in sorted(results.items()): print(f"{name:40s} {r['median'] * 1000:10.3f}ms")
+        return 0
+    with open(args.baseline, "r", encoding="utf-8") as f: baseline = json.load(f)
+    regressions = compare(results, baseline, args.tolerance)
+    if regressions:
+        print(f"\n❌ {len(regressions)} מדידות הואטו: {', '.join(regressions)}")
+        return 1
+    print("\n✅ אין האטות")
+    return 0
+
+
+if __name__ == "__main__":
+    sys.exit(main())
@@ -0,0 +1,277 @@
+# datacache.py - שכבת נתונים משותפת לכל הסשנים של Streamlit
+# עותק מפוענח אחד לכל התהליך, שנטען מחדש רק כשחתימת הקובץ/גרסת ה-DB משתנה,
+# וכל סשן מקבל מעליו "תצוגה" זולה של copy-on-write במקום עותק מלא.
+import os
+import copy
+import time
+import atexit
+import threading
+
+import metrics
+from collections import OrderedDict
+from collections.abc import Mapping, MutableMapping
+
+
+def file_sig(path):
+    # חתימת קובץ זולה: זמן שינוי + גודל (None אם הקובץ לא קיים)
+    try:
+        st = os.stat(path)
+        return (st.st_mtime_ns, st.st_size)
+    except OSError: return None
+
+
+class Memo:
+    # ערך משותף שנבנה מחדש רק כשהמפתח (חתימה/גרסה) משתנה
+    _MISSING = object()
+
+    def __init__(self, loader, name=None):
+        self.loader = loader
+        self.name = name  # לדיווח hit/miss ב-metrics
+        self.key = self._MISSING
+        self.value = None
+        self.lock = threading.RLock()
+
+    def get(self, key):
+        with self.lock:
+            hit = key == self.key
+            if self.name: metrics.cache(self.name, hit)
+            if not hit:
+                self.value = self.loader()
+                self.key = key
+            return self.value
+
+    @property
+    def loaded(self):
+        return self.key is not self._MISSING
+
+    def invalidate(self):
+        with self.lock: self.key = self._MISSING
+
+
+class CowDict(MutableMapping):
+    # תצוגה על מילון משותף: קריאה עוברת לבסיס, כתיבה נשמרת רק בתצוגה.
+    # מילונים פנימיים נעטפים בעצמם רק כשניגשים אליהם, רשימות מועתקות בגישה.
+    __slots__ = ("_base", "_own", "_gone", "_set")
+
+    def __init__(self, base):
+        self._base = base
+        self._own = {}
+        self._gone = set()
+        self._set = set()  # מפתחות שהוצבו ישירות בתצוגה
+
+    def __getitem__(self, k):
+        if k in self._own: return self._own[k]
+        if k in self._gone: raise KeyError(k)
+        v = self._base[k]
+        if isinstance(v, Mapping): v = CowDict(v)
+        elif isinstance(v, list): v = copy.deepcopy(v)
+        else: return v
+        self._own[k] = v
+        return v
+
+    def __setitem__(self, k, v):
+        self._own[k] = v
+        self._gone.discard(k)
+        self._set.add(k)
+
+    def __delitem__(self, k):
+        if k not in self: raise KeyError(k)
+        self._own.pop(k, None)
+        self._set.discard(k)
+        self._gone.add(k)
+
+    def __contains__(self, k):
+        return k in self._own or (k not in self._gone and k in self._base)
+
+    def __iter__(self):
+        for k in self._base:
+            if k not in self._gone: yield k
+        for k in self._own:
+            if k not in self._base: yield k
+
+    def __len__(self):
+        return sum(1 for _ in self)
+
+    def _child_touched(self, k, v):
+        if k in self._set: return True
+        if isinstance(v, CowDict): return v.touched
+        if isinstance(v, list): return v != self._base.get(k)  # רשימה שנערכה במקום (append)
+        return False
+
+    @property
+    def touched(self):
+        # האם משהו בתצוגה (או מתחתיה) שונה מהבסיס
+        return bool(self._gone) or any(self._child_touched(k, v) for k, v in self._own.items())
+
+    @property
+    def base(self):
+        # הערך המשותף שהתצוגה נפתחה מעליו (לזיהוי שמישהו אחר החליף אותו בינתיים)
+        return self._base
+
+    def touched_items(self):
+        # רק הערכים שנגעו בהם בתצוגה - בלי לעטוף את כל שאר הבסיס
+        for k, v in self._own.items():
+            if self._child_touched(k, v): yield k, v
+
+    def unwrap(self):
+        return unwrap(self)
+
+
+def unwrap(v):
+    # עותק רגיל ועמוק (dict/list) של תצוגה או של ערך
+    if isinstance(v, Mapping): return {k: unwrap(x) for k, x in v.items()}
+    if isinstance(v, list): return [unwrap(x) for x in v]
+    return v
+
+
+class LazyMapping(MutableMapping):
+    # מיפוי שהמפתחות שלו באים מאינדקס קל, והערכים נטענים רק כשניגשים אליהם
+    # ונשמרים במטמון LRU משותף (ns מפריד בין כמה מיפויים על אותו מטמון)
+    _MISS = object()
+
+    def __init__(self, load_keys, load_value, cache, ns=None):
+        self._load_keys = load_keys
+        self._load_value = load_value
+        self._cache = cache
+        self._ns = ns
+        self._keys = None
+
+    def _all(self):
+        if self._keys is None: self._keys = dict.fromkeys(self._load_keys())
+        return self._keys
+
+    def __getitem__(self, k):
+        v = self._cache.get((self._ns, k), self._MISS)
+        if v is self._MISS:
+            v = self._load_value(k)
+            if v is None: raise KeyError(k)
+            self._cache.put((self._ns, k), v)
+        return v
+
+    def __setitem__(self, k, v):
+        self._cache.put((self._ns, k), v)
+        if self._keys is not None: self._keys[k] = None
+
+    def __delitem__(self, k):
+        self._cache.pop((self._ns, k))
+        if self._keys is not None: self._keys.pop(k, None)
+
+    def __contains__(self, k):
+        return k in self._all()
+
+    def __iter__(self):
+        return iter(list(self._all()))
+
+    def __len__(self):
+        return len(self._all())
+
+
+class LRUCache:
+    # מטמון חסום בגודל: הפריט שלא נגעו בו הכי הרבה זמן נזרק ראשון
+    def __init__(self, maxsize=64, name=None):
+        self.maxsize = maxsize
+        self.name = name
+        self._data = OrderedDict()
+        self._lock = threading.Lock()
+
+    def get(self, key, default=None):
+        with self._lock:
+            hit = key in self._data
+            if hit:
+                self._data.move_to_end(key)
+                value = self._data[key]
+        if self.name: metrics.cache(self.name, hit)
+        return value if hit else default
+
+    def put(self, key, value):
+        with self._lock:
+            self._data[key] = value
+            self._data.move_to_end(key)
+            while len(self._data) > self.maxsize: self._data.popitem(last=False)
+
+    def pop(self, key, default=None):
+        with self._lock: return self._data.pop(key, default)
+
+    def clear(self):
+        with self._lock: self._data.clear()
+
+    def __len__(self):
+        return len(self._data)
+
+
+class WriteBehind:
+    # מאחד כתיבות: mark(key, value) מסמן ערך כ"מלוכלך" (הערך האחרון לכל מפתח מנצח),
+    # append(item) מוסיף פריט לפי הסדר. ת'רד ברקע קורא ל-write(marked, appended) פעם אחת
+    # לכל פרץ - אחרי delay שניות בלי סימונים חדשים, ולכל היותר max_delay מהסימון הראשון.
+    # write מוציא מ-appended את מה שכתב; בשגיאה כל השאר חוזר לתור וננסה שוב.
+    # delay=0 - כתיבה מיידית (סינכרונית) בכל סימון. lock - נעילה שמוחזקת בזמן הכתיבה
+    def __init__(self, write, delay=0.2, max_delay=2.0, lock=None, name=None):
+        self.write = write
+        self.delay = delay
+        self.max_delay = max_delay
+        self.name = name
+        self.lock = lock or threading.RLock()
+        self._marked = {}
+        self._appended = []
+        self._first = self._last = None
+        self._cond = threading.Condition(threading.Lock())
+        self._thread = None
+        atexit.register(self.flush)
+
+    def mark(self, key, value):
+        self._add(lambda: self._marked.__setitem__(key, value))
+
+    def append(self, item):
+        self._add(lambda: self._appended.append(item))
+
+    def _add(self, change):
+        with self._cond:
+            change()
+            now = time.monotonic()
+            if self._first is None: self._first = now
+            self._last = now
+            if self.delay and self._thread is None:
+                self._thread = threading.Thread(target=self._run, name=f"write-behind-{self.name}", daemon=True)
+                self._thread.start()
+            self._cond.notify()
+        if not self.delay: self.flush()
+
+    def pending(self, key, default=None):
+        with self._cond: return self._marked.get(key, default)
+
+    def appended(self):
+        with self._cond: return list(self._appended)
+
+    def __bool__(self):
+        return bool(self._marked or self._appended)
+
+    def flush(self):
+        # כותב עכשיו את כל מה שממתין (בת'רד הקורא)
+        if not self: return
+        with self.lock:
+            with self._cond:
+                marked, appended = self._marked, self._appended
+                self._marked, self._appended, self._first, self._last = {}, [], None, None
+            if not (marked or appended): return
+            if self.name: metrics.count(f"{self.name}:flush")
+            try: self.write(marked, appended)
+            except:
+                with self._cond:
+                    marked.update(self._marked)  # מה שסומן בינתיים חדש יותר
+                    self._marked, self._appended = marked, appended + self._appended
+                    self._first = self._last = time.monotonic()
+                raise
+
+    def _run(self):
+        while True:
+            with self._cond:
+                while self._first is None: self._cond.wait()
+                now = time.monotonic()
+                due = min(self._last + self.delay, self._first + self.max_delay)
+                if now < due:
+                    self._cond.wait(due - now)
+                    continue
+            try: self.flush()
+            except Exception:
+                if self.name: metrics.count(f"{self.name}:error")
+                time.sleep(self.max_delay)  # DB נעול / דיסק מלא - ננסה שוב אחר כך
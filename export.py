@@ -0,0 +1,161 @@
+# export.py - ייצוא הקליניקה לטבלאות (pandas) ודו"חות סטטיסטיקה, משורת הפקודה
+#
+#   python export.py export/                      # patients.csv + parts.csv
+#   python export.py export/ --format parquet     # דורש pyarrow
+#   python export.py export/ --reports            # גם pain_by_part / field_coverage / caseload
+#
+# המטופלים נקראים מה-DB בחלקים (Store.iter_patients) וכל חלק נכתב מיד לקובץ -
+# עץ הקליניקה לא נבנה בזיכרון. שתי טבלאות:
+#   patients - שורה לכל מטופל: מטפל, שם, מין, ביקור אחרון, מספר איברים ועמודה לכל שדה
+#   parts    - שורה לכל (מטופל, איבר) עם ציון הכאב של המטופל
+import argparse
+import importlib.util
+import os
+import sys
+
+import pandas as pd
+
+import backend as bp
+
+CHUNK = 5000
+HAS_PARQUET = importlib.util.find_spec("pyarrow") is not None
+BASE_COLUMNS = ["therapist", "patient", "gender", "last_visit", "n_parts"]
+PAIN_BINS, PAIN_LABELS = [0, 3, 6, 10], ["1-3", "4-6", "7-10"]
+
+
+def to_frames(chunk, keys):
+    # חלק אחד מ-Store.iter_patients -> (patients, parts). keys - כל השדות (עמודות קבועות בכל החלקים)
+    rows, fields, parts = chunk
+    patients = pd.DataFrame(rows, columns=["id", "therapist", "patient", "gender", "last_visit"]).set_index("id")
+    patients = patients.astype({"therapist": "string", "patient": "string", "gender": "string"})
+    patients["last_visit"] = pd.to_datetime(patients["last_visit"], errors="coerce", format="ISO8601")
+    parts = pd.DataFrame(parts, columns=["id", "part"])
+    patients["n_parts"] = parts["id"].value_counts().reindex(patients.index, fill_value=0)
+    values = pd.DataFrame(fields, columns=["id", "key", "value"]).pivot(index="id", columns="key", values="value")
+    values = values.reindex(index=patients.index, columns=keys).replace("", None)
+    for k in keys:  # ממצאים/רשימות מגיעים כטקסט JSON. ציון כאב 0 = לא נמדד (כמו ב-Store.pain_by_part)
+        patients[k] = (pd.to_numeric(values[k], errors="coerce").replace(0, float("nan")) if k == "pain"
+                       else values[k].astype("string"))
+    parts = parts.join(patients[["therapist", "patient"] + (["pain"] if "pain" in keys else [])], on="id")
+    if "pain" not in keys: parts["pain"] = float("nan")
+    parts["part"] = parts["part"].astype("string")
+    return patients.reset_index(drop=True), parts[["therapist", "patient", "part", "pain"]]
+
+
+def iter_frames(therapist=None, size=CHUNK):
+    bp.flush_saves()  # שמירות שממתינות עוד לא ב-DB
+    s = bp.get_store()
+    keys = s.field_keys()
+    for chunk in s.iter_patients(size, therapist):
+        yield to_frames(chunk, keys)
+
+
+def load_frames(therapist=None, size=CHUNK):
+    # כל הקליניקה כשתי טבלאות (עמודות בלבד, בלי תמלולים - קטן בהרבה מעץ הרשומות)
+    chunks = list(iter_frames(therapist, size))
+    if not chunks: return to_frames(([], [], []), [])
+    return tuple(pd.concat(c, ignore_index=True) for c in zip(*chunks))
+
+
+# --- כתיבה בחלקים ---
+class _CsvSink:
+    def __init__(self, path): self.path, self.first = path, True
+    def write(self, df):
+        # BOM רק בתחילת הקובץ - Excel מזהה UTF-8 (עברית)
+        df.to_csv(self.path, mode="w" if self.first else "a", header=self.first, index=False,
+                  encoding="utf-8-sig" if self.first else "utf-8", date_format="%Y-%m-%dT%H:%M:%S")
+        self.first = False
+    def close(self):
+        if self.first: pd.DataFrame().to_csv(self.path, index=False)
+
+
+class _ParquetSink:
+    def __init__(self, path): self.path, self.writer = path, None
+    def write(self, df):
+        import pyarrow as pa
+        import pyarrow.parquet as pq
+        if self.writer is None:  # הסכמה קבועה מהחלק הראשון: שם, מטפל, שדות - מחרוזות; כאב - מספר
+            self.schema = pa.Schema.from_pandas(df, preserve_index=False)
+            self.writer = pq.ParquetWriter(self.path, self.schema)
+        self.writer.write_table(pa.Table.from_pandas(df, schema=self.schema, preserve_index=False))
+    def close(self):
+        if self.writer is not None: self.writer.close()
+
+
+def export(out_dir, fmt="csv", therapist=None, size=CHUNK):
+    # כותב patients.<fmt> ו-parts.<fmt>. מחזיר את מספר המטופלים
+    if fmt == "parquet" and not HAS_PARQUET: raise RuntimeError("ייצוא parquet דורש pyarrow")
+    os.makedirs(out_dir, exist_ok=True)
+    sink = _ParquetSink if fmt == "parquet" else _CsvSink
+    sinks = [sink(os.path.join(out_dir, f"{name}.{fmt}")) for name in ("patients", "parts")]
+    n = 0
+    try:
+        for frames in iter_frames(therapist, size):
+            for s, df in zip(sinks, frames): s.write(df)
+            n += len(frames[0])
+    finally:
+        for s in sinks: s.close()
+    return n
+
+
+# --- דו"חות ---
+def pain_distribution(parts):
+    # לכל איבר: מטופלים, כמה עם ציון, ממוצע/חציון, ופילוג לפי טווחי כאב
+    g = parts.groupby("part", observed=True)["pain"]
+    out = pd.DataFrame({"patients": g.size(), "scored": g.count(),
+                        "avg_pain": g.mean().round(1), "median_pain": g.median()})
+    bins = pd.crosstab(parts["part"], pd.cut(parts["pain"], PAIN_BINS, labels=PAIN_LABELS))
+    out = out.join(bins.reindex(columns=PAIN_LABELS, fill_value=0)).fillna({l: 0 for l in PAIN_LABELS})
+    return out.astype({l: int for l in PAIN_LABELS}).sort_values("patients", ascending=False).reset_index()
+
+
+def field_coverage(patients):
+    # אחוז המטופלים שהשדה מלא אצלם - לכל מטפל ובשורה "כולם"
+    keys = [c for c in patients.columns if c not in BASE_COLUMNS]
+    filled = patients[keys].notna()
+    out = filled.groupby(patients["therapist"]).mean()
+    out.loc["כולם"] = filled.mean()
+    return (out * 100).round(1).reset_index().rename(columns={"index": "therapist"})
+
+
+def caseload(patients, today=None):
+    # לכל מטפל: מטופלים, פעילים (ביקור ב-30/90 הימים האחרונים), כאב ממוצע, פילוג מין
+    today = pd.Timestamp(today or pd.Timestamp.now().normalize())
+    age = (today - patients["last_visit"]).dt.days
+    df = patients.assign(active_30=age <= 30, active_90=age <= 90,
+                         male=patients["gender"] == "Male", female=patients["gender"] == "Female")
+    if "pain" not in df: df["pain"] = float("nan")
+    g = df.groupby("therapist")
+    out = pd.DataFrame({"patients": g.size(), "active_30": g["active_30"].sum(), "active_90": g["active_90"].sum(),
+                        "male": g["male"].sum(), "female": g["female"].sum(),
+                        "avg_pain": g["pain"].mean().round(1), "last_visit": g["last_visit"].max()})
+    return out.sort_values("patients", ascending=False).reset_index()
+
+
+def reports(therapist=None, size=CHUNK):
+    # {שם: DataFrame} - כל הדו"חות מקריאה אחת של ה-DB
+    patients, parts = load_frames(therapist, size)
+    return {"pain_by_part": pain_distribution(parts), "field_coverage": field_coverage(patients),
+            "caseload": caseload(patients)}
+
+
+def main(argv=None):
+    ap = argparse.ArgumentParser(description="ייצוא נתוני הקליניקה לטבלאות ודו\"חות")
+    ap.add_argument("out", help="תיקיית פלט")
+    ap.add_argument("--format", choices=["csv", "parquet"], default="csv")
+    ap.add_argument("--therapist", help="רק המטופלים של מטפל אחד")
+    ap.add_argument("--chunk", type=int, default=CHUNK, help="כמה מטופלים נקראים בכל פעם")
+    ap.add_argument("--reports", action="store_true", help="לכתוב גם דו\"חות סיכום (CSV)")
+    args = ap.parse_args(argv)
+
+    try: n = export(args.out, args.format, args.therapist, args.chunk)
+    except RuntimeError as e: sys.exit(str(e))
+    print(f"יוצאו {n} מטופלים אל {args.out}", file=sys.stderr)
+    if args.reports:
+        for name, df in reports(args.therapist, args.chunk).items():
+            df.to_csv(os.path.join(args.out, f"{name}.csv"), index=False, encoding="utf-8-sig")
+            print(f"{name}.csv: {len(df)} שורות", file=sys.stderr)
+
+
+if __name__ == "__main__":
+    main()
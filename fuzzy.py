@@ -0,0 +1,160 @@
+# fuzzy.py - תיקון שגיאות כתיב של הזיהוי הקולי לפני ההתאמה למילונים ("סכרת" -> "סוכרת")
+# אינדקס מחיקות בסגנון SymSpell: לכל מילה במילונים נשמרות כל הצורות שמתקבלות ממחיקת
+# עד d אותיות. מילה מהטקסט מייצרת את המחיקות שלה ומחפשת אותן במילון - כמה חיפושים
+# במילון לכל מילה, בלי קשר לגודל אוצר המילים. ההתאמה מאומתת במרחק עריכה אמיתי.
+# האינדקס נבנה פעם אחת ונשמר ב-FUZZY_FILE עם חתימה של אוצר המילים - שינוי במילונים בונה מחדש.
+import os
+import json
+import hashlib
+import threading
+from functools import lru_cache
+
+import search
+
+FUZZY_FILE = "fuzzy_index.json"
+FORMAT = 1        # שינוי במבנה הקובץ/באלגוריתם - מעלים כדי לבנות מחדש
+MIN_LEN = 4       # מילים קצרות מזה לא מתוקנות (יותר מדי מילים אמיתיות במרחק 1)
+SHORT_LEN = 6     # במילים קצרות מזה מתקנים רק טעויות "שמיעה" (ראו _plausible)
+LONG_LEN = 9      # ממילים באורך הזה מותר מרחק 2
+# אותיות שנשמעות אותו דבר (והאותיות הסופיות) - הזיהוי מחליף ביניהן
+HOMOPHONES = {frozenset(p) for p in ["טת", "כח", "כק", "סש", "אע", "וב", "כך", "מם", "נן", "פף", "צץ"]}
+
+CACHE_MAX = 65536  # כמה מילים שכבר נבדקו נשמרות (אוצר המילים של הקליניקה חוזר על עצמו)
+
+enabled = os.environ.get("PHYSIO_FUZZY", "1") != "0"
+
+
+def max_distance(word):
+    return 0 if len(word) < MIN_LEN else 1 if len(word) < LONG_LEN else 2
+
+
+def _deletes(word, d):
+    # כל הצורות שמתקבלות ממחיקת 1..d אותיות
+    out, level = set(), {word}
+    for _ in range(d):
+        level = {w[:i] + w[i + 1:] for w in level for i in range(len(w))}
+        out |= level
+    return out
+
+
+def distance(a, b, limit):
+    # מרחק עריכה (כולל החלפת שתי אותיות סמוכות). מחזיר limit+1 כשהמרחק גדול מ-limit
+    if abs(len(a) - len(b)) > limit: return limit + 1
+    prev2, prev = None, list(range(len(b) + 1))
+    for i in range(1, len(a) + 1):
+        cur = [i] + [0] * len(b)
+        for j in range(1, len(b) + 1):
+            cur[j] = min(prev[j] + 1, cur[j - 1] + 1, prev[j - 1] + (a[i - 1] != b[j - 1]))
+            if i > 1 and j > 1 and a[i - 1] == b[j - 2] and a[i - 2] == b[j - 1]:
+                cur[j] = min(cur[j], prev2[j - 2] + 1)
+        if min(cur) > limit: return limit + 1
+        prev2, prev = prev, cur
+    return prev[-1]
+
+
+def _plausible(word, cand):
+    # במילה קצרה כמעט כל החלפה נותנת מילה אחרת ("הולכת"/"ללכת"), אז מקבלים רק מה
+    # שהזיהוי באמת עושה: כתיב חסר/מלא (ו/י נוספה או חסרה באמצע המילה - לא בתחילתה
+    # או בסופה: "ישנים" היא לא "שנים") או אות שנשמעת אותו דבר
+    if len(word) == len(cand):
+        diff = [(a, b) for a, b in zip(word, cand) if a != b]
+        return len(diff) == 1 and frozenset(diff[0]) in HOMOPHONES
+    short, long_ = sorted((word, cand), key=len)
+    return any(long_[i] in "וי" and long_[:i] + long_[i + 1:] == short for i in range(1, len(long_) - 1))
+
+
+class FuzzyIndex:
+    def __init__(self, vocab, deletes=None):
+        # vocab - המילים הנכונות. deletes: {מחיקה: [אינדקסים ב-vocab]} (מהקובץ, או נבנה כאן)
+        self.vocab = sorted(set(vocab))
+        self._known = set(self.vocab)
+        if deletes is None:
+            deletes = {}
+            for i, w in enumerate(self.vocab):
+                for v in {w} | _deletes(w, max_distance(w)):
+                    deletes.setdefault(v, []).append(i)
+        self.deletes = deletes
+        self._fixes = {}  # מילה -> המילה המתוקנת (או היא עצמה)
+
+    def correct_word(self, word):
+        # המילה הקרובה ביותר במילון, או None. מילה עם אותיות שימוש (ב/ל/מ/ו/ה)
+        # מתוקנת בלעדיהן והן מוחזרות למקומן ("בסכרת" -> "בסוכרת")
+        for core in search.variants(word):
+            d = max_distance(core)
+            if not d: break
+            if core in self._known: return None
+            best, best_d = set(), d + 1
+            for v in {core} | _deletes(core, d):
+                for i in self.deletes.get(v, ()):
+                    cand = self.vocab[i]
+                    dist = distance(core, cand, d)
+                    if dist > d or (len(core) < SHORT_LEN and not _plausible(core, cand)): continue
+                    if dist < best_d: best, best_d = {cand}, dist
+                    elif dist == best_d: best.add(cand)
+            if len(best) == 1:  # כמה מילים באותו מרחק - לא מנחשים
+                return word[:len(word) - len(core)] + best.pop()
+        return None
+
+    def correct(self, text):
+        # מחליף מילה-במילה - מספר המילים והסדר שלהן לא משתנים (אינדקס המילה נשאר תקף)
+        fixes = self._fixes
+        if len(fixes) > CACHE_MAX: fixes.clear()
+        return " ".join([fixes.get(w) or fixes.setdefault(w, self.correct_word(w) or w) for w in text.split()])
+
+    # --- קובץ מקומפל ---
+    def dump(self, path, source):
+        data = {"format": FORMAT, "source": source, "vocab": self.vocab, "deletes": self.deletes}
+        import store
+        store.atomic_write_json(path, data)
+
+    @classmethod
+    def load(cls, path, source):
+        # None אם הקובץ חסר, פגום או נבנה מאוצר מילים אחר
+        try:
+            with open(path, "r", encoding="utf-8") as f: data = json.load(f)
+        except (OSError, ValueError): return None
+        if data.get("format") != FORMAT or data.get("source") != source: return None
+        return cls(data["vocab"], data["deletes"])
+
+
+def vocabulary(keywords):
+    # המילים הבודדות שבמילות המפתח (גם מתוך ביטויים של כמה מילים)
+    return {w for k in keywords for w in k.split() if len(w) >= MIN_LEN}
+
+
+def signature(vocab):
+    return hashlib.sha256("\n".join(sorted(vocab)).encode("utf-8")).hexdigest()[:16]
+
+
+_lock = threading.Lock()
+
+
+@lru_cache(maxsize=1)
+def _shared():
+    import matcher
+    vocab = vocabulary(k for k, _ in matcher._static_entries())
+    source = signature(vocab)
+    with _lock:
+        idx = FuzzyIndex.load(FUZZY_FILE, source)
+        if idx is None:
+            idx = FuzzyIndex(vocab)
+            try: idx.dump(FUZZY_FILE, source)
+            except OSError: pass  # תיקייה לקריאה בלבד - עובדים עם האינדקס מהזיכרון
+    return idx
+
+
+def shared_index():
+    # אינדקס משותף על כל המילונים הקבועים (MEDICAL_BRAIN, KNOWLEDGE_BASE, רמזי האיברים)
+    return _shared()
+
+
+def correct(text, index=None):
+    if not enabled or not text: return text
+    return (index or shared_index()).correct(text)
+
+
+if __name__ == "__main__":
+    # python fuzzy.py - בונה מחדש את FUZZY_FILE (למשל בזמן build של הקונטיינר)
+    if os.path.exists(FUZZY_FILE): os.remove(FUZZY_FILE)
+    idx = shared_index()
+    print(f"{FUZZY_FILE}: {len(idx.vocab)} מילים, {len(idx.deletes)} מחיקות")
@@ -0,0 +1,28 @@
+# heatmap.py - מפת חום על מפת הגוף (NumPy)
+# כל נקודה (איבר) הופכת לכתם גאוסיאני במשקל שלה. גאוסיאן דו-ממדי הוא מכפלה של שני
+# גאוסיאנים חד-ממדיים, אז סכום כל הכתמים הוא מכפלת מטריצות אחת (H×K)·(K×W) -
+# העלות תלויה במספר האיברים ובגודל התמונה, לא במספר המטופלים.
+import numpy as np
+
+# סולם צבעים: כחול (מעט) -> טורקיז -> צהוב -> אדום (הכי הרבה)
+STOPS = np.array([0.0, 0.33, 0.66, 1.0])
+COLORS = np.array([[0, 0, 255], [0, 255, 255], [255, 255, 0], [255, 0, 0]], dtype=float)
+
+
+def splat(points, weights, size, sigma):
+    # points: [(x, y)], weights: [w], size: (רוחב, גובה) -> מערך גובה×רוחב
+    w, h = size
+    pts = np.asarray(points, dtype=float).reshape(-1, 2)
+    wts = np.asarray(weights, dtype=float)
+    gx = np.exp(-(np.arange(w)[None, :] - pts[:, :1]) ** 2 / (2 * sigma ** 2))  # K×W
+    gy = np.exp(-(np.arange(h)[None, :] - pts[:, 1:]) ** 2 / (2 * sigma ** 2))  # K×H
+    return (gy * wts[:, None]).T @ gx
+
+
+def colorize(grid, alpha=190):
+    # מערך עוצמות -> RGBA (uint8), מנורמל למקסימום. איפה שאין כלום - שקוף
+    top = grid.max()
+    v = grid / top if top > 0 else grid
+    rgb = np.stack([np.interp(v, STOPS, COLORS[:, c]) for c in range(3)], axis=-1)
+    a = np.clip(v * 2.5, 0, 1) * alpha  # שוליים רכים במקום עיגול חד
+    return np.dstack([rgb, a]).astype(np.uint8)
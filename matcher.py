@@ -0,0 +1,108 @@
+# matcher.py - מנוע התאמה אחד (Aho-Corasick) לכל מילוני המערכת
+# האוטומט נבנה פעם אחת מכל מילות המפתח ומוצא את כל ההופעות במעבר יחיד על הטקסט,
+# כולל מיקום המילה (token) שבה ההתאמה מתחילה - גם עבור ביטויים של כמה מילים.
+import re
+from bisect import bisect_right
+from collections import namedtuple, deque
+from functools import lru_cache
+
+# keyword - המחרוזת שנמצאה, start/end - מיקום בתווים, token - אינדקס המילה בטקסט
+Hit = namedtuple("Hit", "keyword start end token")
+
+# סוגי תוויות: לאיזה מילון שייכת מילת מפתח
+PART = "part"      # שם נקודה במפת הגוף (coords_db)
+BRAIN = "brain"    # medical_knowledge.MEDICAL_BRAIN
+KB = "kb"          # medical_brain.KNOWLEDGE_BASE
+ENGINE = "engine"  # רמזי איבר/צד/מבט של analyze_text_engine
+
+_WORD = re.compile(r"\S+")
+
+
+class Matcher:
+    def __init__(self, entries):
+        # entries: זוגות של (מילת_מפתח, תווית). לאותה מילה יכולות להיות כמה תוויות
+        self.labels = {}
+        self._goto = [{}]
+        self._fail = [0]
+        self._out = [()]
+        for keyword, label in entries:
+            if not keyword: continue
+            if keyword not in self.labels:
+                self.labels[keyword] = []
+                self._add(keyword)
+            if label not in self.labels[keyword]: self.labels[keyword].append(label)
+        self._link()
+
+    def _add(self, keyword):
+        node = 0
+        for ch in keyword:
+            nxt = self._goto[node].get(ch)
+            if nxt is None:
+                nxt = len(self._goto)
+                self._goto[node][ch] = nxt
+                self._goto.append({}); self._fail.append(0); self._out.append(())
+            node = nxt
+        self._out[node] = (keyword,)
+
+    def _link(self):
+        # BFS לבניית קישורי כישלון ואיחוד הפלטים לאורך שרשרת הסיומות
+        queue = deque(self._goto[0].values())
+        while queue:
+            node = queue.popleft()
+            for ch, nxt in self._goto[node].items():
+                queue.append(nxt)
+                f = self._fail[node]
+                while f and ch not in self._goto[f]: f = self._fail[f]
+                self._fail[nxt] = self._goto[f].get(ch, 0)
+                self._out[nxt] = self._out[nxt] + self._out[self._fail[nxt]]
+
+    def scan(self, text):
+        # מחזיר את כל ההופעות (כולל חופפות) לפי סדר סיומן בטקסט
+        starts = [m.start() for m in _WORD.finditer(text)]
+        goto, fail, out = self._goto, self._fail, self._out
+        hits = []
+        node = 0
+        for i, ch in enumerate(text):
+            while node and ch not in goto[node]: node = fail[node]
+            node = goto[node].get(ch, 0)
+            for kw in out[node]:
+                s = i - len(kw) + 1
+                hits.append(Hit(kw, s, i + 1, max(0, bisect_right(starts, s) - 1)))
+        return hits
+
+    def first_hits(self, text):
+        # ההופעה הראשונה של כל מילת מפתח (כמו `key in text` + words.index)
+        first = {}
+        for h in self.scan(text):
+            if h.keyword not in first or h.start < first[h.keyword].start: first[h.keyword] = h
+        return first
+
+
+def _static_entries():
+    # ייבוא מאוחר כדי לא ליצור תלות מעגלית עם המודולים שמשתמשים במנוע
+    entries = []
+    try:
+        import medical_knowledge as mk
+        for category, keywords in mk.MEDICAL_BRAIN.items():
+            entries += [(k, (BRAIN, category, k)) for k in keywords]
+        for key in list(mk.ENGINE_PARTS) + mk.BACK_VIEW_WORDS + [mk.LEFT_WORD]:
+            entries.append((key, (ENGINE, None, key)))
+    except ImportError: pass
+    try:
+        import medical_brain as mb
+        for category, concepts in mb.KNOWLEDGE_BASE.items():
+            for term, synonyms in concepts.items():
+                entries += [(s, (KB, category, term)) for s in synonyms]
+    except ImportError: pass
+    return entries
+
+
+@lru_cache(maxsize=8)
+def _build(body_parts):
+    return Matcher(_static_entries() + [(p, (PART, None, p)) for p in body_parts])
+
+
+def shared_matcher(body_parts=()):
+    # אוטומט משותף: המילונים הקבועים + נקודות מפת הגוף הנוכחיות.
+    # נבנה מחדש רק כשרשימת הנקודות משתנה (כיול בחדר הבקרה)
+    return _build(frozenset(body_parts))
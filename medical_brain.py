@@ -1,40 +1,45 @@
+import matcher
+import fuzzy
+
+# זהו הלב של המערכת - מיפוי משמעויות
+# המבנה: { "קטגוריה_בטופס": { "מושג_רפואי": [רשימת_מילים_נרדפות] } }
+KNOWLEDGE_BASE = {
+    # --- היסטוריה רפואית (GH) ---
+    "general_health": {
+        "סוכרת": ["סוכרת", "סוכר גבוה", "אינסולין", "גלוקוז", "מטפורמין"],
+        "יתר לחץ דם": ["לחץ דם", "ל״ד", "יתר ל.ד", "כדורים ללב"],
+        "בעיות לב": ["התקף לב", "צנתור", "קוצב", "הפרעות קצב"],
+        "ניתוחים": ["ניתוח", "קיסרי", "אפנדציט", "החלפת מפרק"],
+        "אוסטיאופורוזיס": ["בריחת סידן", "צפיפות עצם", "עצמות חלשות"]
+    },
+    
+    # --- תלונת המטופל (HPC) ---
+    "hpc": {
+        "טראומה/חבלה": ["נפלתי", "מכה", "תאונה", "החלקתי", "חבלה", "בום"],
+        "התפרצות": ["התחיל פתאום", "התעוררתי עם זה", "אחרי אימון", "סחבתי משהו"],
+        "כרוני": ["כבר הרבה זמן", "שנים", "בא והולך", "ישן"]
+    },
+    
+    # --- גורמים מחמירים (Aggravating) ---
+    "aggravating": {
+        "תנועה": ["הליכה", "ללכת", "ריצה", "זז", "תזוזה"],
+        "מנח סטטי": ["עמידה", "ישיבה", "לעמוד", "לשבת"],
+        "עומס": ["להרים", "משקל", "סחיבה", "מאמץ", "מדרגות"],
+        "שינה": ["שכיבה", "בלילה", "במיטה"]
+    },
+    
+    # --- גורמים מקלים (Easing) ---
+    "easing": {
+        "מנוחה": ["לנוח", "שוכב", "לא זז", "יושב"],
+        "טיפול עצמי": ["מקלחת", "מים חמים", "קרח", "חימום", "מסאז"],
+        "תרופתי": ["כדור", "משחה", "זריקה"]
+    }
+}
+
+
 class MedicalBrain:
     def __init__(self):
-        # זהו הלב של המערכת - מיפוי משמעויות
-        # המבנה: { "קטגוריה_בטופס": { "מושג_רפואי": [רשימת_מילים_נרדפות] } }
-        
-        self.knowledge_base = {
-            # --- היסטוריה רפואית (GH) ---
-            "general_health": {
-                "סוכרת": ["סוכרת", "סוכר גבוה", "אינסולין", "גלוקוז", "מטפורמין"],
-                "יתר לחץ דם": ["לחץ דם", "ל״ד", "יתר ל.ד", "כדורים ללב"],
-                "בעיות לב": ["התקף לב", "צנתור", "קוצב", "הפרעות קצב"],
-                "ניתוחים": ["ניתוח", "קיסרי", "אפנדציט", "החלפת מפרק"],
-                "אוסטיאופורוזיס": ["בריחת סידן", "צפיפות עצם", "עצמות חלשות"]
-            },
-            
-            # --- תלונת המטופל (HPC) ---
-            "hpc": {
-                "טראומה/חבלה": ["נפלתי", "מכה", "תאונה", "החלקתי", "חבלה", "בום"],
-                "התפרצות": ["התחיל פתאום", "התעוררתי עם זה", "אחרי אימון", "סחבתי משהו"],
-                "כרוני": ["כבר הרבה זמן", "שנים", "בא והולך", "ישן"]
-            },
-            
-            # --- גורמים מחמירים (Aggravating) ---
-            "aggravating": {
-                "תנועה": ["הליכה", "ללכת", "ריצה", "זז", "תזוזה"],
-                "מנח סטטי": ["עמידה", "ישיבה", "לעמוד", "לשבת"],
-                "עומס": ["להרים", "משקל", "סחיבה", "מאמץ", "מדרגות"],
-                "שינה": ["שכיבה", "בלילה", "במיטה"]
-            },
-            
-            # --- גורמים מקלים (Easing) ---
-            "easing": {
-                "מנוחה": ["לנוח", "שוכב", "לא זז", "יושב"],
-                "טיפול עצמי": ["מקלחת", "מים חמים", "קרח", "חימום", "מסאז"],
-                "תרופתי": ["כדור", "משחה", "זריקה"]
-            }
-        }
+        self.knowledge_base = KNOWLEDGE_BASE
 
     def analyze(self, text):
         # 1. ניקוי הטקסט
@@ -50,17 +55,26 @@ class MedicalBrain:
         }
         
         # 2. הסריקה החכמה
-        # עוברים על כל הקטגוריות במוח
+        # מעבר יחיד על הטקסט עם המנוע המשותף - כל המילים הנרדפות בבת אחת
+        # שגיאות כתיב של הזיהוי הקולי ("סכרת") מתוקנות קודם מול אותו אוצר מילים
+        if self.knowledge_base is KNOWLEDGE_BASE:
+            m, fz = matcher.shared_matcher(), None
+        else: # מוח מותאם אישית - אוטומט ואינדקס תיקון פרטיים משלו
+            m = self._matcher = getattr(self, "_matcher", None) or matcher.Matcher(
+                (s, (matcher.KB, c, term)) for c, concepts in self.knowledge_base.items()
+                for term, synonyms in concepts.items() for s in synonyms)
+            fz = self._fuzzy = getattr(self, "_fuzzy", None) or fuzzy.FuzzyIndex(fuzzy.vocabulary(m.labels))
+        matched = set()
+        for key in m.first_hits(fuzzy.correct(clean_text, fz)):
+            for kind, category, medical_term in m.labels[key]:
+                if kind == matcher.KB: matched.add((category, medical_term))
+        
+        # במקום לכתוב סתם את המילה שנאמרה ("סוכר"), נכתוב את המושג הרפואי ("סוכרת")
+        # שומרים על סדר המושגים במוח, וכל מושג נכתב פעם אחת בלבד
         for category, concepts in self.knowledge_base.items():
-            # עוברים על כל מושג רפואי (למשל 'סוכרת')
-            for medical_term, synonyms in concepts.items():
-                # בודקים אם אחת המילים הנרדפות מופיעה בטקסט של המטופל
-                for synonym in synonyms:
-                    if synonym in clean_text:
-                        # בינגו! מצאנו התאמה.
-                        # במקום לכתוב סתם את המילה שנאמרה ("סוכר"), נכתוב את המושג הרפואי ("סוכרת")
-                        findings[category].append(medical_term)
-                        break # מפסיקים לחפש את אותו מושג כדי לא לכתוב פעמיים
+            for medical_term in concepts:
+                if (category, medical_term) in matched:
+                    findings.setdefault(category, []).append(medical_term)
         
         # 3. ניקוי ועיצוב התוצאות
         final_output = {}
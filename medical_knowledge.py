@@ -1,4 +1,6 @@
 # medical_knowledge.py
+import matcher
+import fuzzy
 
 # קואורדינטות ברירת מחדל
 DEFAULT_BODY_COORDS = {
@@ -58,24 +60,33 @@ MEDICAL_BRAIN = {
     ]
 }
 
+# רמזים לזיהוי איבר, צד ומבט (analyze_text_engine)
+ENGINE_PARTS = {
+    "כתף": "כתף {side} - {view}", "ברך": "ברך {side} - {view}",
+    "ראש": "ראש - {view}", "צוואר": "צוואר - {view}",
+    "גב תחתון": "גב תחתון", "גב": "גב עליון", "אגן": "אגן - {view}",
+    "מרפק": "מרפק {side} - {view}", "קרסול": "קרסול {side} - {view}"
+}
+BACK_VIEW_WORDS = ["גב", "אחור", "עורף", "ישבן"]
+LEFT_WORD = "שמאל"
+
+def snippet_at(words, idx, before, after=5):
+    # הקשר סביב מילת המפתח: כמה מילים לפני ועד 5 מילים קדימה
+    return " ".join(words[max(0, idx - before):min(len(words), idx + after)])
+
 def analyze_text_engine(text):
     results = {"body_parts": [], "pain": 0, "fields": {}}
     t = text.replace(",", "").replace(".", "")
     words = t.split()
+    m = matcher.shared_matcher()
+    hits = m.first_hits(fuzzy.correct(t))  # מעבר יחיד על הטקסט (אחרי תיקון כתיב) לכל המילונים
     
     # מיפוי גוף
-    side = "שמאל" if "שמאל" in t else "ימין"
-    view = "אחורי" if any(w in t for w in ["גב", "אחור", "עורף", "ישבן"]) else "קדמי"
+    side = "שמאל" if LEFT_WORD in hits else "ימין"
+    view = "אחורי" if any(w in hits for w in BACK_VIEW_WORDS) else "קדמי"
     
-    potential_parts = {
-        "כתף": f"כתף {side} - {view}", "ברך": f"ברך {side} - {view}",
-        "ראש": f"ראש - {view}", "צוואר": f"צוואר - {view}",
-        "גב תחתון": "גב תחתון", "גב": "גב עליון", "אגן": f"אגן - {view}",
-        "מרפק": f"מרפק {side} - {view}", "קרסול": f"קרסול {side} - {view}"
-    }
-    
-    for key, val in potential_parts.items():
-        if key in t: results["body_parts"].append(val)
+    for key, val in ENGINE_PARTS.items():
+        if key in hits: results["body_parts"].append(val.format(side=side, view=view))
 
     # זיהוי כאב
     for w in words:
@@ -84,20 +95,14 @@ def analyze_text_engine(text):
             if 0 <= val <= 10: results["pain"] = val
 
     # מיון לשדות
-    for category, keywords in MEDICAL_BRAIN.items():
-        found_snippets = []
-        for key in keywords:
-            if key in t:
-                try:
-                    idx = words.index(key)
-                    start = max(0, idx - 2)
-                    end = min(len(words), idx + 5)
-                    snippet = " ".join(words[start:end])
-                    found_snippets.append(snippet)
-                except:
-                    found_snippets.append(key)
-        
-        if found_snippets:
-            results["fields"][category] = " | ".join(list(set(found_snippets)))
+    found_snippets = {}
+    for key, hit in hits.items():
+        for kind, category, _ in m.labels[key]:
+            if kind == matcher.BRAIN:
+                found_snippets.setdefault(category, set()).add(snippet_at(words, hit.token, 2))
+    
+    for category in MEDICAL_BRAIN:
+        if category in found_snippets:
+            results["fields"][category] = " | ".join(found_snippets[category])
             
-    return results
\ No newline at end of file
+    return results
@@ -0,0 +1,97 @@
+# metrics.py - מדידת זמנים ומונים בנתיבים החמים (לחדר הבקרה)
+# כל פונקציה עם @timed שומרת את זמני הריצה האחרונים שלה (חלון מתגלגל) ומהם p50/p95/p99.
+# מטמונים מדווחים hit/miss. PHYSIO_METRICS=0 מכבה הכל (בדיקת דגל אחת לקריאה),
+# ו-PHYSIO_METRICS_LOG=path כותב כל מדידה גם כשורת JSONL.
+import os
+import json
+import time
+import threading
+import functools
+from collections import deque, defaultdict
+
+WINDOW = 1000  # כמה מדידות אחרונות נשמרות לכל פונקציה
+
+enabled = os.environ.get("PHYSIO_METRICS", "1") != "0"
+_samples = defaultdict(lambda: deque(maxlen=WINDOW))
+_totals = defaultdict(int)
+_counters = defaultdict(int)
+_lock = threading.Lock()
+_sink = None
+_sink_path = os.environ.get("PHYSIO_METRICS_LOG")
+
+
+def set_enabled(on):
+    global enabled
+    enabled = bool(on)
+
+
+def record(name, seconds):
+    with _lock:
+        _samples[name].append(seconds)
+        _totals[name] += 1
+    if _sink_path: _write_sink({"ts": time.time(), "name": name, "ms": round(seconds * 1000, 3)})
+
+
+def _write_sink(entry):
+    global _sink
+    with _lock:
+        if _sink is None: _sink = open(_sink_path, "a", encoding="utf-8", buffering=1)
+        _sink.write(json.dumps(entry, ensure_ascii=False) + "\n")
+
+
+def timed(name=None):
+    def deco(fn):
+        label = name or fn.__name__
+
+        @functools.wraps(fn)
+        def wrapper(*args, **kwargs):
+            if not enabled: return fn(*args, **kwargs)
+            t = time.perf_counter()
+            try: return fn(*args, **kwargs)
+            finally: record(label, time.perf_counter() - t)
+        return wrapper
+    return deco
+
+
+def count(name, n=1):
+    if not enabled: return
+    with _lock: _counters[name] += n
+
+
+def cache(name, hit):
+    # דיווח על גישה למטמון: hit=True פגיעה, False החטאה
+    if not enabled: return
+    with _lock: _counters[f"{name}:{'hit' if hit else 'miss'}"] += 1
+
+
+def _pct(sorted_vals, q):
+    return sorted_vals[min(len(sorted_vals) - 1, int(q * len(sorted_vals)))]
+
+
+def timings():
+    # [{name, calls, p50_ms, p95_ms, p99_ms, max_ms}] לפי סדר שם
+    with _lock: snap = {k: (sorted(v), _totals[k]) for k, v in _samples.items() if v}
+    return [{"name": k, "calls": n,
+             "p50_ms": round(_pct(v, 0.50) * 1000, 3), "p95_ms": round(_pct(v, 0.95) * 1000, 3),
+             "p99_ms": round(_pct(v, 0.99) * 1000, 3), "max_ms": round(v[-1] * 1000, 3)}
+            for k, (v, n) in sorted(snap.items())]
+
+
+def caches():
+    # [{name, hits, misses, hit_rate}]
+    with _lock: counters = dict(_counters)
+    names = sorted({k.rsplit(":", 1)[0] for k in counters if k.endswith((":hit", ":miss"))})
+    out = []
+    for n in names:
+        h, m = counters.get(f"{n}:hit", 0), counters.get(f"{n}:miss", 0)
+        out.append({"name": n, "hits": h, "misses": m, "hit_rate": round(h / (h + m), 3) if h + m else None})
+    return out
+
+
+def counters():
+    with _lock: return {k: v for k, v in sorted(_counters.items()) if not k.endswith((":hit", ":miss"))}
+
+
+def reset():
+    with _lock:
+        _samples.clear(); _totals.clear(); _counters.clear()
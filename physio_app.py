@@ -1,11 +1,5 @@
 import streamlit as st
-# ייבוא רכיבי UI
-from streamlit_mic_recorder import mic_recorder
-try:
-    from streamlit_image_coordinates import streamlit_image_coordinates
-    HAS_CALIB = True
-except ImportError: HAS_CALIB = False
-
+# רכיבי ה-UI (הקלטה, כיול) מיובאים רק בדף שמשתמש בהם
 import os
 import datetime
 # === החיבור לפועל החדש שלנו ===
@@ -51,7 +45,16 @@ if st.session_state.page == "admin":
     with c1:
         new_p = st.text_input("שם נקודה לכיול:", placeholder="למשל: מרפק שמאל")
         st.write("נקודות קיימות:"); st.json(list(st.session_state.coords.keys()))
+        # תצוגת הכיול: כל הנקודות, והנקודה שנבחרה מודגשת
+        if new_p in st.session_state.coords:
+            chart = bp.body_chart_html("Male", list(st.session_state.coords), st.session_state.coords,
+                                       st.session_state.coords[new_p])
+            if chart: st.markdown(chart, unsafe_allow_html=True)
     with c2:
+        try:
+            from streamlit_image_coordinates import streamlit_image_coordinates
+            HAS_CALIB = True
+        except ImportError: HAS_CALIB = False
         if HAS_CALIB and os.path.exists("body_male.png"):
             val = streamlit_image_coordinates("body_male.png", key="calib")
             if val and new_p:
@@ -60,6 +63,39 @@ if st.session_state.page == "admin":
                 st.success(f"נשמר: {new_p}"); st.rerun()
         else: st.warning("אין תמונה או רכיב כיול")
 
+    # --- מפת חום של כל הקליניקה ---
+    st.markdown("<div class='section-header'>🔥 מפת כאב - כל הקליניקה</div>", unsafe_allow_html=True)
+    h1, h2 = st.columns([1, 2])
+    with h1:
+        who = st.selectbox("מטפל:", ["כולם"] + list(st.session_state.clinic_db.keys()))
+        dates = st.date_input("ביקור אחרון בין:", value=(), format="DD/MM/YYYY")
+        hg = st.radio("מפה:", ["Male", "Female"], horizontal=True)
+        since, until = (d.isoformat() for d in dates) if len(dates) == 2 else (None, None)
+        th_f = None if who == "כולם" else who
+        st.dataframe([{k: r[k] for k in ("part", "patients", "avg_pain")}
+                      for r in bp.pain_by_part(th_f, since, until)], hide_index=True, use_container_width=True)
+    with h2:
+        heat = bp.draw_heatmap(st.session_state.coords, th_f, since, until, hg)
+        if heat: st.image(heat)
+        else: st.warning("אין תמונה או NumPy")
+
+    # --- ביצועים: זמני תגובה ומטמונים (מתעדכן כל 2 שניות) ---
+    st.markdown("<div class='section-header'>📊 ביצועים</div>", unsafe_allow_html=True)
+    @st.fragment(run_every=2)
+    def latency_panel():
+        m = bp.metrics
+        on = st.toggle("מדידה פעילה", value=m.enabled)
+        if on != m.enabled: m.set_enabled(on)
+        c1, c2 = st.columns([2, 1])
+        with c1:
+            st.caption("זמני ריצה (ms) - חלון של המדידות האחרונות")
+            st.dataframe(m.timings(), hide_index=True, use_container_width=True)
+        with c2:
+            st.caption("מטמונים")
+            st.dataframe(m.caches(), hide_index=True, use_container_width=True)
+        if st.button("🔄 איפוס מדידות"): m.reset()
+    latency_panel()
+
 # ===========================
 # דף 2: הקליניקה (ראשי)
 # ===========================
@@ -76,10 +112,20 @@ else:
         with st.expander("➕ מטופל חדש"):
             nn = st.text_input("שם:"); ng = st.radio("מין:", ["Male", "Female"], horizontal=True)
             if st.button("צור") and nn:
-                patients[nn] = {"gender": ng, "text": "", "fields": {}}
+                patients[nn] = {"gender": ng, "fields": {}}
                 bp.save_db(st.session_state.clinic_db); st.rerun()
         
-        if patients: curr_p = st.selectbox("תיק פעיל:", list(patients.keys()))
+        # רק עמוד אחד של שמות מהאינדקס - התיק עצמו נטען רק כשבוחרים בו
+        q = st.text_input("🔎 סינון לפי שם:")
+        found = st.text_input("🔍 חיפוש בתיקים:", placeholder="למשל: סוכרת, ברך")
+        if found:  # מטופלים שהמילים מופיעות בתמלול/בשדות/באיברים שלהם
+            names = [n for _, n in bp.search_patients(found, therapist, q)]
+        else:
+            pages = bp.patient_pages(therapist, q)
+            page = st.number_input(f"עמוד (מתוך {pages})", 1, pages, 1) if pages > 1 else 1
+            names = bp.patient_page(therapist, q, page)
+        if names: curr_p = st.selectbox("תיק פעיל:", names)
+        elif q or found: st.warning("לא נמצאו מטופלים"); st.stop()
         else: st.warning("צור מטופל"); st.stop()
         
         st.markdown("---")
@@ -97,27 +143,59 @@ else:
     with c2: st.caption(datetime.date.today().strftime("%d/%m/%Y"))
 
     # הקלטה
+    from streamlit_mic_recorder import mic_recorder
     st.markdown('<div class="rec-btn">', unsafe_allow_html=True)
     audio = mic_recorder(start_prompt="🎤 התחל הקלטה", stop_prompt="⏹️ סיים ונתח", key='rec')
     st.markdown('</div>', unsafe_allow_html=True)
     
+    # התמלול רץ ברקע: שומרים לאיזה תיק שייכת כל הקלטה וממשיכים לעבוד על הטופס
+    if 'pending_audio' not in st.session_state: st.session_state.pending_audio = {}
+    pending = st.session_state.pending_audio
+    handled = st.session_state.setdefault('handled_audio', set())
+    failed = st.session_state.setdefault('failed_audio', {})
     if audio:
-        st.toast("מעבד...")
-        text = bp.process_audio(audio['bytes'])
-        if text:
-            p_data["text"] += "\n" + text
-            # קריאה ללוגיקה ב-backend
-            res = bp.analyze_text(text, st.session_state.coords)
-            
-            for k, v in res['fields'].items():
-                old = anl.get(k, "")
-                if v not in old: anl[k] = f"{old} {v}".strip()
-            
-            if res['body_parts']: p_data["parts"] = res['body_parts']
-            if res['pain'] > 0: anl["pain"] = res['pain']
-            
-            bp.save_db(st.session_state.clinic_db)
-            st.rerun()
+        # mic_recorder מחזיר את אותה הקלטה בכל rerun - נשלחת לתור רק הקלטה שעוד לא טופלה
+        digest = bp.audio_digest(audio['bytes'])
+        if digest not in pending and digest not in handled:
+            bp.start_transcription(audio['bytes'])
+            pending[digest] = (therapist, curr_p, audio['bytes'])
+            st.toast("מתמלל ברקע...")
+    
+    for digest, (th, pn, data) in list(pending.items()):
+        state, text, res, is_new = bp.transcription_result(digest, st.session_state.coords)
+        if state in ("pending", "running"): continue
+        del pending[digest]
+        handled.add(digest)
+        if state == "failed": failed[digest] = (th, pn, data); continue
+        if not text:
+            if state == "done": st.warning("לא זוהו מילים בהקלטה - נסה להקליט שוב")
+            continue
+        if not is_new: continue  # כבר הוחל
+        # הקלטה שכבר עובדה לא מגיעה לכאן שוב - בלי כתיבה כפולה ל-DB
+        bp.apply_transcript(st.session_state.clinic_db[th]["patients"][pn], text, res)
+        bp.save_db(st.session_state.clinic_db)
+        bp.add_utterance(th, pn, text)
+        st.rerun()
+    
+    # הקלטה שנכשלה נשלחת שוב רק בלחיצה (לא בכל rerun - שלא תתפוס את התור של כולם)
+    for digest, (th, pn, data) in list(failed.items()):
+        e1, e2, e3 = st.columns([4, 1, 1])
+        with e1: st.error(f"התמלול נכשל ({pn})")
+        with e2:
+            if st.button("🔁 נסה שוב", key=f"retry_{digest}"):
+                del failed[digest]
+                bp.start_transcription(data, retry=True)
+                pending[digest] = (th, pn, data); st.rerun()
+        with e3:
+            if st.button("✖", key=f"drop_{digest}"): del failed[digest]; st.rerun()
+
+    if pending:
+        # בודק כל שנייה אם התמלול הסתיים, בלי לחסום את שאר הדף
+        @st.fragment(run_every=1)
+        def watch_transcriptions():
+            st.caption(f"⏳ מתמלל {len(pending)} הקלטות...")
+            if any(bp.transcription_state(d) not in ("pending", "running") for d in pending): st.rerun()
+        watch_transcriptions()
 
     st.markdown("---")
     c_form, c_vis = st.columns([1.5, 1])
@@ -137,14 +215,23 @@ else:
         with c4: st.text_area("Easing", value=anl.get("ease", ""), height=60)
         
         if st.button("💾 שמור"):
-            bp.save_db(st.session_state.clinic_db); st.success("נשמר!")
+            conflicts = bp.save_db(st.session_state.clinic_db)
+            if conflicts:  # סשן אחר שינה את אותם שדות בינתיים - נשמרה הגרסה שלנו
+                st.warning("נשמר, אבל השדות האלה שונו גם בסשן אחר: " +
+                           ", ".join(k for _, _, keys in conflicts for k in keys))
+            else: st.success("נשמר!")
 
     with c_vis:
         st.markdown("#### Body Chart")
         parts = p_data.get("parts", [])
         pain = anl.get("pain", 0)
-        final_img = bp.draw_map(p_data["gender"], parts, pain, st.session_state.coords)
-        if final_img: st.image(final_img, use_container_width=True)
-        else: st.warning("חסרה תמונה")
+        if bp.CHART_MODE == "svg":  # תמונת הבסיס נשמרת בדפדפן - נשלחים רק הסימונים
+            chart = bp.body_chart_html(p_data["gender"], parts, st.session_state.coords)
+            if chart: st.markdown(chart, unsafe_allow_html=True)
+            else: st.warning("חסרה תמונה")
+        else:
+            final_img = bp.draw_map_png(p_data["gender"], parts, pain, st.session_state.coords)
+            if final_img: st.image(final_img, use_container_width=True)
+            else: st.warning("חסרה תמונה")
         
-    with st.expander("📝 תמלול מלא"): st.text(p_data.get("text", ""))
\ No newline at end of file
+    with st.expander("📝 תמלול מלא"): st.text(bp.transcript(therapist, curr_p))
\ No newline at end of file
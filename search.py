@@ -0,0 +1,39 @@
+# search.py - פירוק טקסט למונחים לאינדקס החיפוש (אינדקס הפוך: מונח -> מטופלים)
+# מנרמל ניקוד ופיסוק, ולכל מילה שמתחילה באות שימוש (ב/ל/מ/ו/ה) נשמרת גם הצורה בלעדיה:
+# "ובברך" נשמרת כ-"ובברך", "בברך" ו-"ברך" - כך חיפוש "ברך" מוצא את כולן.
+# אותיות סופיות הופכות לרגילות (ך->כ), אחרת התחילית "ברך" לא מוצאת את "הברכיים".
+import re
+from functools import lru_cache
+
+PREFIXES = "בלמוה"
+MAX_STRIP = 2     # כמה אותיות שימוש לכל היותר מורידים מתחילת מילה ("ובברך" -> "ברך")
+MIN_LEN = 2       # מונחים קצרים מזה (ומספרים) לא נשמרים
+
+_NIQQUD = re.compile("[\u0591-\u05bd\u05bf\u05c1\u05c2\u05c4\u05c5\u05c7]")  # טעמים וניקוד (בלי מקף)
+_WORD = re.compile(r"\w+")
+_FINALS = str.maketrans("ךםןףץ", "כמנפצ")
+
+
+def words(text):
+    text = _NIQQUD.sub("", text or "").replace('"', "").replace("'", "").lower().translate(_FINALS)
+    return [w for w in _WORD.findall(text) if len(w) >= MIN_LEN and not w.isdigit()]
+
+
+@lru_cache(maxsize=65536)  # אוצר המילים של הקליניקה חוזר על עצמו
+def variants(word):
+    # המילה עצמה ואחריה הצורות בלי אותיות השימוש
+    out = (word,)
+    while len(out) <= MAX_STRIP and word[0] in PREFIXES and len(word) - 1 >= MIN_LEN:
+        word = word[1:]
+        out += (word,)
+    return out
+
+
+def terms(text):
+    return {v for w in set(words(text)) for v in variants(w)}
+
+
+def query_terms(query):
+    # לכל מילה בשאילתה: (המילה - מחופשת כתחילית, הצורות בלי אותיות שימוש - רק אם המילה
+    # עצמה לא נמצאה, כדי ש"ברך" לא יחפש גם "רך"). מטופל נמצא רק אם כל המילים מופיעות אצלו
+    return [(v[0], v[1:]) for v in map(variants, dict.fromkeys(words(query)))]
@@ -0,0 +1,498 @@
+# store.py - אחסון הקליניקה ב-SQLite (מחליף את שכתוב clinic_data.json בכל שמירה)
+# מטפלים, מטופלים, תמלולים ושדות נשמרים בטבלאות עם אינדקסים.
+# כל שמירה משווה לתמונת המצב האחרונה וכותבת רק את השורות שהשתנו - בטרנזקציה אחת.
+# לכל מטופל יש מספר גרסה: אם מישהו אחר כתב אותו מאז שקראנו, הרשומות ממוזגות (merge_records).
+import sqlite3
+import json
+import os
+import threading
+import time
+import search
+
+SCHEMA = """
+CREATE TABLE IF NOT EXISTS therapists (
+    name TEXT PRIMARY KEY,
+    profile TEXT NOT NULL DEFAULT '{}'
+);
+CREATE TABLE IF NOT EXISTS patients (
+    id INTEGER PRIMARY KEY,
+    therapist TEXT NOT NULL REFERENCES therapists(name) ON DELETE CASCADE,
+    name TEXT NOT NULL,
+    gender TEXT,
+    parts TEXT NOT NULL DEFAULT '[]',
+    extra TEXT NOT NULL DEFAULT '{}',
+    last_visit TEXT,
+    version INTEGER NOT NULL DEFAULT 0,
+    UNIQUE (therapist, name)
+);
+CREATE TABLE IF NOT EXISTS transcripts (
+    patient_id INTEGER PRIMARY KEY REFERENCES patients(id) ON DELETE CASCADE,
+    text TEXT NOT NULL DEFAULT ''
+);
+CREATE TABLE IF NOT EXISTS utterances (
+    patient_id INTEGER NOT NULL REFERENCES patients(id) ON DELETE CASCADE,
+    seq INTEGER NOT NULL,
+    ts TEXT NOT NULL,
+    text TEXT NOT NULL,
+    PRIMARY KEY (patient_id, seq)
+);
+CREATE TABLE IF NOT EXISTS fields (
+    patient_id INTEGER NOT NULL REFERENCES patients(id) ON DELETE CASCADE,
+    key TEXT NOT NULL,
+    value TEXT,
+    PRIMARY KEY (patient_id, key)
+);
+-- אינדקס חיפוש הפוך: מונח -> מטופל. src: 'r' = מהרשומה (שדות, איברים), 'u' = מהתמלול
+CREATE TABLE IF NOT EXISTS terms (
+    term TEXT NOT NULL,
+    patient_id INTEGER NOT NULL REFERENCES patients(id) ON DELETE CASCADE,
+    src TEXT NOT NULL,
+    PRIMARY KEY (term, patient_id, src)
+) WITHOUT ROWID;
+CREATE INDEX IF NOT EXISTS patients_by_therapist ON patients(therapist);
+CREATE INDEX IF NOT EXISTS terms_by_patient ON terms(patient_id, src);
+"""
+# אינדקסים שתלויים בעמודות שנוספו אחרי הגרסה הראשונה (נוצרים אחרי _upgrade)
+INDEXES = """
+CREATE INDEX IF NOT EXISTS patients_by_visit ON patients(therapist, last_visit);
+"""
+INDEX_VERSION = 2  # PRAGMA user_version: שינוי בפירוק למונחים מחייב בנייה מחדש של terms
+SNAP_MAX = 5000  # כמה תמונות מצב של מטופלים נשמרות בזיכרון לצורך השוואה בשמירה
+
+# מפתחות שיש להם עמודה/טבלה משלהם. כל השאר נשמר ב-extra כ-JSON.
+# התמלול לא נטען לתוך הרשומה (שלא תגדל עם ההיסטוריה): כל הקלטה היא שורה ב-utterances,
+# ו-text (תמלול ישן, מלפני הפיצול) נשמר רק אם הוא קיים ברשומה
+_OWN_KEYS = ("gender", "parts", "text", "fields")
+
+
+def _dump(v): return json.dumps(v, ensure_ascii=False, sort_keys=True, default=dict)  # default: תצוגות CowDict
+
+
+def _split(p):
+    # מפרק רשומת מטופל לחלקים שנשמרים בנפרד (כולם כמחרוזות להשוואה זולה)
+    row = (p.get("gender"), _dump(p.get("parts", [])),
+           _dump({k: v for k, v in p.items() if k not in _OWN_KEYS}))
+    return {"row": row, "text": p.get("text"),
+            "fields": {k: _dump(v) for k, v in (p.get("fields") or {}).items()}}
+
+
+def _record_terms(split):
+    # מונחי החיפוש של הרשומה: שמות האיברים וערכי השדות (לא מספרים כמו pain)
+    values = [json.loads(v) for v in split["fields"].values()] + json.loads(split["row"][1])
+    return search.terms(" ".join(v for v in values if isinstance(v, str)))
+
+
+def _record(gender, parts, extra):
+    p = json.loads(extra)
+    if gender is not None: p["gender"] = gender
+    p["parts"] = json.loads(parts)
+    p["fields"] = {}
+    return p
+
+
+def _join(split):
+    # ההפך של _split - הרשומה כפי שהייתה בתמונת המצב
+    p = _record(*split["row"])
+    p["fields"] = {k: json.loads(v) for k, v in split["fields"].items()}
+    if split["text"] is not None: p["text"] = split["text"]
+    return p
+
+
+_MISSING = object()
+
+
+def merge_records(base, mine, theirs):
+    # מיזוג תלת-כיווני: base - מה שקראנו, mine - מה שאנחנו שומרים, theirs - מה שכתוב עכשיו.
+    # מה שרק צד אחד שינה נלקח ממנו; מילונים (fields, findings) ממוזגים לפי מפתח.
+    # מה ששני הצדדים שינו אחרת - הגרסה שלנו נשמרת, והמפתח מוחזר ברשימת ההתנגשויות
+    merged, conflicts = {}, []
+    for k in dict.fromkeys([*theirs, *mine, *base]):
+        b, m, t = base.get(k, _MISSING), mine.get(k, _MISSING), theirs.get(k, _MISSING)
+        if all(isinstance(v, dict) or v is _MISSING for v in (b, m, t)) and m is not _MISSING and t is not _MISSING:
+            v, sub = merge_records({} if b is _MISSING else b, m, t)
+            conflicts += [f"{k}.{c}" for c in sub]
+        elif _same(m, t) or _same(t, b): v = m
+        elif _same(m, b): v = t
+        else: v = m; conflicts.append(k)
+        if v is not _MISSING: merged[k] = v
+    return merged, conflicts
+
+
+def _same(a, b):
+    if a is _MISSING or b is _MISSING: return a is b
+    return _dump(a) == _dump(b)
+
+
+class Store:
+    # merge - פונקציית המיזוג בהתנגשות (ברירת מחדל merge_records)
+    def __init__(self, path, merge=None):
+        self.path = path
+        self.merge = merge or merge_records
+        self._lock = threading.Lock()
+        self._conn = sqlite3.connect(path, check_same_thread=False, isolation_level=None)
+        self._conn.execute("PRAGMA foreign_keys = ON")
+        self._conn.execute("PRAGMA journal_mode = WAL")
+        self._conn.executescript(SCHEMA)
+        self._upgrade()
+        self._conn.executescript(INDEXES)
+        # תמונת מצב של מה שנמצא בדיסק: {(מטפל, מטופל): חלקים}, {מטפל: פרופיל}, {(מטפל, מטופל): (id, גרסה)}
+        self._snap, self._profiles, self._ids = {}, {}, {}
+        self._writes = 0
+
+    def _upgrade(self):
+        # DB שנוצר בגרסה קודמת - מוסיפים עמודות חסרות
+        cols = {r[1] for r in self._conn.execute("PRAGMA table_info(patients)")}
+        if "version" not in cols:
+            self._conn.execute("ALTER TABLE patients ADD COLUMN version INTEGER NOT NULL DEFAULT 0")
+        if "last_visit" not in cols:
+            self._conn.execute("ALTER TABLE patients ADD COLUMN last_visit TEXT")
+            self._conn.execute("UPDATE patients SET last_visit = (SELECT MAX(ts) FROM utterances u "
+                               "WHERE u.patient_id = patients.id)")
+        if self._conn.execute("PRAGMA user_version").fetchone()[0] < INDEX_VERSION:
+            self.reindex()
+            self._conn.execute(f"PRAGMA user_version = {INDEX_VERSION}")
+
+    def version(self):
+        # משתנה כשתהליך אחר כתב ל-DB (data_version) או כשאנחנו כתבנו
+        with self._lock:
+            return (self._conn.execute("PRAGMA data_version").fetchone()[0], self._writes)
+
+    def is_empty(self):
+        return self._conn.execute("SELECT 1 FROM therapists LIMIT 1").fetchone() is None
+
+    # --- קריאה לפי דרישה: אינדקס קל לכל מטפל ורשומה אחת בכל פעם (אין טעינה של כל העץ) ---
+    def therapists(self):
+        with self._lock:
+            rows = self._conn.execute("SELECT name, profile FROM therapists ORDER BY rowid").fetchall()
+        for name, profile in rows: self._profiles[name] = profile
+        return {name: json.loads(profile) for name, profile in rows}
+
+    def _prefix_where(self, prefix):
+        # טווח על האינדקס (therapist, name) במקום LIKE - עובד גם בעברית
+        if not prefix: return "", ()
+        return " AND name >= ? AND name < ?", (prefix, prefix + "\U0010ffff")
+
+    def patient_index(self, therapist, prefix="", limit=-1, offset=0):
+        # [(שם, מין, ביקור_אחרון)] - הביקור האחרון קודם
+        where, args = self._prefix_where(prefix)
+        with self._lock:
+            return self._conn.execute(
+                "SELECT name, gender, last_visit FROM patients WHERE therapist = ?" + where +
+                " ORDER BY last_visit IS NULL, last_visit DESC, name LIMIT ? OFFSET ?",
+                (therapist,) + args + (limit, offset)).fetchall()
+
+    def count_patients(self, therapist, prefix=""):
+        where, args = self._prefix_where(prefix)
+        with self._lock:
+            return self._conn.execute("SELECT COUNT(*) FROM patients WHERE therapist = ?" + where,
+                                      (therapist,) + args).fetchone()[0]
+
+    def load_patient(self, therapist, name):
+        with self._lock:
+            row = self._conn.execute("SELECT id, version FROM patients WHERE therapist = ? AND name = ?",
+                                     (therapist, name)).fetchone()
+            if row is None: return None
+            p = self._read_patient(row[0])
+            self._ids[(therapist, name)] = row
+            self._snap.pop((therapist, name), None)
+            self._snap[(therapist, name)] = _split(p)
+            while len(self._snap) > SNAP_MAX: del self._snap[next(iter(self._snap))]
+            return p
+
+    def _read_patient(self, pid):
+        c = self._conn
+        p = _record(*c.execute("SELECT gender, parts, extra FROM patients WHERE id = ?", (pid,)).fetchone())
+        for key, value in c.execute("SELECT key, value FROM fields WHERE patient_id = ?", (pid,)):
+            p["fields"][key] = json.loads(value)
+        return p
+
+    # --- חיפוש ---
+    def search(self, query, therapist=None, prefix="", limit=50):
+        # [(מטפל, שם)] של המטופלים שכל מילות השאילתה מופיעות בתמלול/בשדות/באיברים שלהם
+        q = search.query_terms(query)
+        if not q: return []
+        with self._lock:
+            c = self._conn
+            subs, args = [], []
+            for word, stripped in q:
+                where, w_args = "term >= ? AND term < ?", (word, word + "\U0010ffff")
+                if stripped and not c.execute(f"SELECT 1 FROM terms WHERE {where} LIMIT 1", w_args).fetchone():
+                    where, w_args = f"term IN ({','.join('?' * len(stripped))})", tuple(stripped)
+                subs.append(f"SELECT patient_id FROM terms WHERE {where}")
+                args += w_args
+            where, p_args = self._prefix_where(prefix)
+            if therapist is not None: where, p_args = " AND therapist = ?" + where, (therapist,) + p_args
+            return c.execute(f"SELECT therapist, name FROM patients WHERE id IN ({' INTERSECT '.join(subs)})" +
+                             where + " ORDER BY last_visit IS NULL, last_visit DESC, name LIMIT ?",
+                             tuple(args) + p_args + (limit,)).fetchall()
+
+    # --- סטטיסטיקה ---
+    def pain_by_part(self, therapist=None, since=None, until=None):
+        # [(איבר, מטופלים, סכום ציוני כאב, מטופלים עם ציון)] - מקובץ בתוך SQLite, בלי לטעון רשומות.
+        # since/until - תאריכים (YYYY-MM-DD, כולל) על הביקור האחרון
+        where, args = [], []
+        if therapist is not None: where.append("p.therapist = ?"); args.append(therapist)
+        if since: where.append("p.last_visit >= ?"); args.append(since)
+        if until: where.append("substr(p.last_visit, 1, 10) <= ?"); args.append(until)
+        with self._lock:
+            return self._conn.execute(
+                "SELECT j.value, COUNT(*), COALESCE(SUM(pain), 0), COUNT(pain) FROM ("
+                "SELECT p.parts, NULLIF(CAST(json_extract(f.value, '$') AS REAL), 0) AS pain FROM patients p "
+                "LEFT JOIN fields f ON f.patient_id = p.id AND f.key = 'pain'" +
+                (" WHERE " + " AND ".join(where) if where else "") +
+                "), json_each(parts) j GROUP BY j.value", args).fetchall()
+
+    # --- ייצוא: סריקה בחלקים לפי id (בלי לטעון את כל הקליניקה לזיכרון) ---
+    def field_keys(self):
+        with self._lock:
+            return [k for (k,) in self._conn.execute("SELECT DISTINCT key FROM fields ORDER BY key")]
+
+    def iter_patients(self, size=5000, therapist=None):
+        # חלקים של (מטופלים, שדות, איברים) כשורות שטוחות לפי סדר id - לטבלאות (export.py):
+        # [(id, מטפל, שם, מין, ביקור_אחרון)], [(id, שדה, ערך)], [(id, איבר)].
+        # ה-JSON מפורק בתוך SQLite; הנעילה משתחררת בין חלק לחלק - שמירות לא מחכות לסוף הייצוא
+        where, args = ("AND therapist = ? ", (therapist,)) if therapist is not None else ("", ())
+        last = 0
+        while True:
+            with self._lock:
+                c = self._conn
+                rows = c.execute("SELECT id, therapist, name, gender, last_visit FROM patients "
+                                 "WHERE id > ? " + where + "ORDER BY id LIMIT ?", (last,) + args + (size,)).fetchall()
+                if not rows: return
+                ids = (rows[0][0], rows[-1][0]) + args
+                fields = c.execute("SELECT f.patient_id, f.key, json_extract(f.value, '$') FROM fields f "
+                                   "JOIN patients p ON p.id = f.patient_id WHERE p.id BETWEEN ? AND ? " + where, ids).fetchall()
+                parts = c.execute("SELECT p.id, j.value FROM patients p, json_each(p.parts) j "
+                                  "WHERE p.id BETWEEN ? AND ? " + where, ids).fetchall()
+            last = rows[-1][0]
+            yield rows, fields, parts
+
+    def reindex(self):
+        # בונה את אינדקס החיפוש מאפס (DB מגרסה קודמת / שינוי בפירוק למונחים)
+        c = self._conn
+        rows = {}
+        for pid, parts in c.execute("SELECT id, parts FROM patients"):
+            rows[pid] = {"row": (None, parts, None), "fields": {}}
+        for pid, key, value in c.execute("SELECT patient_id, key, value FROM fields"):
+            rows[pid]["fields"][key] = value
+        c.execute("BEGIN IMMEDIATE")
+        try:
+            c.execute("DELETE FROM terms")
+            for pid, split in rows.items():
+                self._add_terms(pid, _record_terms(split), "r")
+            for pid, text in c.execute("SELECT patient_id, text FROM transcripts UNION ALL "
+                                       "SELECT patient_id, text FROM utterances").fetchall():
+                self._add_terms(pid, search.terms(text), "u")
+            c.execute("COMMIT")
+        except:
+            c.execute("ROLLBACK")
+            raise
+
+    def _add_terms(self, pid, terms, src):
+        self._conn.executemany("INSERT OR IGNORE INTO terms (term, patient_id, src) VALUES (?, ?, ?)",
+                               [(t, pid, src) for t in terms])
+
+    # --- כתיבה ---
+    def save(self, db, merged=None):
+        # כותב רק מה שהשתנה מאז הטעינה/השמירה האחרונה. מטופלים שחסרים בעץ לא נמחקים
+        # (עותק ישן של סשן אחר לא ימחק מטופל חדש) - למחיקה יש delete_patient.
+        # מחזיר את רשימת המטופלים (מטפל, שם) שנכתבו בפועל. מטופלים שמוזגו עם גרסה
+        # חדשה יותר מהדיסק נכנסים ל-merged: {(מטפל, שם): (הרשומה שנכתבה, התנגשויות)}
+        merged = {} if merged is None else merged
+        with self._lock:
+            c = self._conn
+            changed, ids = [], {}
+            c.execute("BEGIN IMMEDIATE")
+            try:
+                for therapist, t_data in db.items():
+                    if "profile" in t_data:
+                        profile = _dump(t_data["profile"])
+                        if self._profiles.get(therapist) != profile:
+                            c.execute("INSERT INTO therapists (name, profile) VALUES (?, ?) "
+                                      "ON CONFLICT(name) DO UPDATE SET profile = excluded.profile",
+                                      (therapist, profile))
+                    elif therapist not in self._profiles:
+                        c.execute("INSERT OR IGNORE INTO therapists (name) VALUES (?)", (therapist,))
+                        profile = c.execute("SELECT profile FROM therapists WHERE name = ?", (therapist,)).fetchone()[0]
+                    else: profile = self._profiles[therapist]
+                    for name, p in (t_data.get("patients") or {}).items():
+                        written = self._save_patient(therapist, name, p, merged)
+                        if written:
+                            ids[(therapist, name)] = written
+                            changed.append((therapist, name))
+                    self._profiles[therapist] = profile
+                c.execute("COMMIT")
+                self._ids.update(ids)
+                self._writes += 1
+                return changed
+            except:
+                c.execute("ROLLBACK")
+                self._snap, self._profiles = {}, {}  # לא ידוע מה נכתב - הכל ייכתב שוב
+                raise
+
+    def _save_patient(self, therapist, name, p, merged):
+        # מחזיר (id, גרסה חדשה) אם נכתב משהו
+        c = self._conn
+        key = (therapist, name)
+        new = _split(p)
+        old = self._snap.get(key)
+        if old == new: return None
+        # הנעילה (BEGIN IMMEDIATE) כבר אצלנו - הגרסה שבדיסק לא תשתנה עד סוף הטרנזקציה
+        row = c.execute("SELECT id, version FROM patients WHERE therapist = ? AND name = ?", key).fetchone()
+        if row is not None and row != self._ids.get(key):
+            # נכתב מאז שקראנו (תהליך אחר / מטופל שלא ראינו) - ממזגים עם מה שבדיסק
+            p, conflicts = self.merge(_join(old) if old else {}, p, self._read_patient(row[0]))
+            merged[key] = (p, conflicts)
+            new, old = _split(p), None
+        if row is None:
+            pid = c.execute("INSERT INTO patients (therapist, name, gender, parts, extra, version) "
+                            "VALUES (?, ?, ?, ?, ?, 1)", key + new["row"]).lastrowid
+            version, old = 1, None
+        else:
+            pid, version = row[0], row[1] + 1
+            if old is None or old["row"] != new["row"]:
+                c.execute("UPDATE patients SET gender = ?, parts = ?, extra = ?, version = ? WHERE id = ?",
+                          new["row"] + (version, pid))
+            else: c.execute("UPDATE patients SET version = ? WHERE id = ?", (version, pid))
+        if new["text"] is not None and (old is None or old["text"] != new["text"]):
+            c.execute("INSERT INTO transcripts (patient_id, text) VALUES (?, ?) "
+                      "ON CONFLICT(patient_id) DO UPDATE SET text = excluded.text", (pid, new["text"]))
+            self._add_terms(pid, search.terms(new["text"]), "u")
+        # אינדקס החיפוש: רק ההפרש בין המונחים הישנים לחדשים
+        terms = _record_terms(new)
+        if old is None:
+            c.execute("DELETE FROM terms WHERE patient_id = ? AND src = 'r'", (pid,))
+            self._add_terms(pid, terms, "r")
+        else:
+            old_terms = _record_terms(old)
+            c.executemany("DELETE FROM terms WHERE term = ? AND patient_id = ? AND src = 'r'",
+                          [(t, pid) for t in old_terms - terms])
+            self._add_terms(pid, terms - old_terms, "r")
+        old_fields = old["fields"] if old else None
+        if old_fields is None:
+            c.execute("DELETE FROM fields WHERE patient_id = ?", (pid,))
+            old_fields = {}
+        for key, value in new["fields"].items():
+            if old_fields.get(key) != value:
+                c.execute("INSERT INTO fields (patient_id, key, value) VALUES (?, ?, ?) "
+                          "ON CONFLICT(patient_id, key) DO UPDATE SET value = excluded.value", (pid, key, value))
+        for key in old_fields.keys() - new["fields"].keys():
+            c.execute("DELETE FROM fields WHERE patient_id = ? AND key = ?", (pid, key))
+        self._snap[(therapist, name)] = new
+        return pid, version
+
+    # --- תמלול ---
+    def add_utterance(self, therapist, name, text, ts):
+        # הוספת הקלטה אחת לתמלול - שורה חדשה בלבד, בלי לגעת ברשומת המטופל
+        with self._lock:
+            c = self._conn
+            row = c.execute("SELECT id FROM patients WHERE therapist = ? AND name = ?", (therapist, name)).fetchone()
+            if row is None: raise KeyError((therapist, name))
+            c.execute("BEGIN IMMEDIATE")
+            try:
+                c.execute("INSERT INTO utterances (patient_id, seq, ts, text) VALUES (?, "
+                          "(SELECT COALESCE(MAX(seq), 0) + 1 FROM utterances WHERE patient_id = ?), ?, ?)",
+                          (row[0], row[0], ts, text))
+                c.execute("UPDATE patients SET last_visit = ? WHERE id = ?", (ts, row[0]))
+                self._add_terms(row[0], search.terms(text), "u")
+                c.execute("COMMIT")
+            except:
+                c.execute("ROLLBACK")
+                raise
+
+    def transcript(self, therapist, name):
+        # התמלול המלא: הטקסט הישן (אם יש) ואחריו כל ההקלטות לפי הסדר
+        with self._lock:
+            c = self._conn
+            row = c.execute("SELECT id FROM patients WHERE therapist = ? AND name = ?", (therapist, name)).fetchone()
+            if row is None: return ""
+            legacy = c.execute("SELECT text FROM transcripts WHERE patient_id = ?", row).fetchone()
+            parts = [legacy[0]] if legacy and legacy[0] else []
+            parts += [t for (t,) in c.execute("SELECT text FROM utterances WHERE patient_id = ? ORDER BY seq", row)]
+        return "\n".join(parts)
+
+    def delete_patient(self, therapist, name):
+        with self._lock:
+            self._conn.execute("DELETE FROM patients WHERE therapist = ? AND name = ?", (therapist, name))
+            self._snap.pop((therapist, name), None)
+            self._ids.pop((therapist, name), None)
+            self._writes += 1
+
+    def close(self):
+        self._conn.close()
+
+
+# --- כתיבה אטומית של קובץ ---
+def atomic_write_json(path, data):
+    # קובץ זמני באותה תיקייה -> fsync -> rename: אחרי קריסה יש את הקובץ הישן או החדש, לא חצי
+    tmp = f"{path}.{os.getpid()}.{threading.get_ident()}.tmp"
+    try:
+        with open(tmp, "w", encoding="utf-8") as f:
+            json.dump(data, f)
+            f.flush()
+            os.fsync(f.fileno())
+        os.replace(tmp, path)
+    except:
+        if os.path.exists(tmp): os.remove(tmp)
+        raise
+    if hasattr(os, "O_DIRECTORY"):  # שה-rename עצמו ישרוד נפילת חשמל
+        fd = os.open(os.path.dirname(os.path.abspath(path)), os.O_RDONLY | os.O_DIRECTORY)
+        try: os.fsync(fd)
+        finally: os.close(fd)
+
+
+# --- מטמון תמלולים לפי תוכן ההקלטה ---
+class AudioCache:
+    # תוצאות זיהוי+ניתוח לפי hash של קובץ האודיו. נשמר בין הפעלות, ומוגבל בגודל:
+    # כשעוברים את max_entries, הרשומות הוותיקות ביותר נזרקות
+    def __init__(self, path, max_entries=2000):
+        self.max_entries = max_entries
+        self._lock = threading.Lock()
+        self._conn = sqlite3.connect(path, check_same_thread=False, isolation_level=None)
+        self._conn.execute("PRAGMA journal_mode = WAL")
+        self._conn.execute("CREATE TABLE IF NOT EXISTS audio_results ("
+                           "digest TEXT PRIMARY KEY, result TEXT NOT NULL, created REAL NOT NULL)")
+        self._conn.execute("CREATE INDEX IF NOT EXISTS audio_results_by_age ON audio_results(created)")
+
+    def get(self, digest):
+        with self._lock:
+            row = self._conn.execute("SELECT result FROM audio_results WHERE digest = ?", (digest,)).fetchone()
+        return json.loads(row[0]) if row else None
+
+    def put(self, digest, result, replace=True):
+        # replace=False: נכתב רק אם ההקלטה עוד לא במטמון. מחזיר האם נכתב -
+        # כך רק סשן אחד "זוכה" להחיל את התוצאה על התיק
+        with self._lock:
+            c = self._conn
+            c.execute("BEGIN IMMEDIATE")
+            try:
+                added = c.execute(f"INSERT OR {'REPLACE' if replace else 'IGNORE'} INTO audio_results "
+                                  "(digest, result, created) VALUES (?, ?, ?)",
+                                  (digest, _dump(result), time.time())).rowcount == 1
+                c.execute("DELETE FROM audio_results WHERE digest IN (SELECT digest FROM audio_results "
+                          "ORDER BY created DESC LIMIT -1 OFFSET ?)", (self.max_entries,))
+                c.execute("COMMIT")
+                return added
+            except:
+                c.execute("ROLLBACK")
+                raise
+
+    def __len__(self):
+        with self._lock: return self._conn.execute("SELECT COUNT(*) FROM audio_results").fetchone()[0]
+
+
+# --- העברה חד-פעמית מ-clinic_data.json ---
+def migrate_json(json_path, db_path):
+    with open(json_path, "r", encoding="utf-8") as f: data = json.load(f)
+    s = Store(db_path)
+    try: s.save(data)
+    finally: s.close()
+    return sum(len(t.get("patients") or {}) for t in data.values())
+
+
+if __name__ == "__main__":
+    import sys
+    src = sys.argv[1] if len(sys.argv) > 1 else "clinic_data.json"
+    dst = sys.argv[2] if len(sys.argv) > 2 else "clinic.db"
+    if os.path.exists(dst): sys.exit(f"{dst} כבר קיים - לא דורס")
+    print(f"הועברו {migrate_json(src, dst)} מטופלים מ-{src} אל {dst}")
@@ -0,0 +1,5 @@
+# הבדיקות מייבאות את המודולים שבשורש הריפו (כמו bench.py)
+import os
+import sys
+
+sys.path.insert(0, os.path.dirname(os.path.dirname(os.path.abspath(__file__))))
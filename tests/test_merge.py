@@ -0,0 +1,86 @@
+# מיזוג תלת-כיווני של רשומת מטופל (store.merge_records) ושמירה משני חיבורים במקביל
+import store
+
+
+def finding(v, n=1):
+    return {"v": v, "session": "2026-10-01", "ts": "2026-10-01T10:00:00", "n": n}
+
+
+BASE = {"gender": "Male", "parts": ["ברך ימין - קדמי"],
+        "fields": {"hpc": "נפל במדרגות", "gh": "סוכרת", "pain": 5},
+        "findings": {"hpc": {"נפל במדרגות": finding("נפל במדרגות")}}}
+
+
+def copy(p):
+    return store._join(store._split(p))
+
+
+def test_disjoint_edits_are_both_kept():
+    mine, theirs = copy(BASE), copy(BASE)
+    mine["fields"]["gh"] = "סוכרת, לחץ דם"
+    theirs["fields"]["pain"] = 7
+    theirs["parts"] = ["ברך ימין - קדמי", "גב תחתון"]
+    merged, conflicts = store.merge_records(BASE, mine, theirs)
+    assert conflicts == []
+    assert merged["fields"] == {"hpc": "נפל במדרגות", "gh": "סוכרת, לחץ דם", "pain": 7}
+    assert merged["parts"] == ["ברך ימין - קדמי", "גב תחתון"]
+
+
+def test_same_change_on_both_sides_is_not_a_conflict():
+    mine, theirs = copy(BASE), copy(BASE)
+    mine["fields"]["pain"] = theirs["fields"]["pain"] = 8
+    merged, conflicts = store.merge_records(BASE, mine, theirs)
+    assert conflicts == [] and merged["fields"]["pain"] == 8
+
+
+def test_conflicting_edits_keep_mine_and_are_reported():
+    mine, theirs = copy(BASE), copy(BASE)
+    mine["fields"]["pain"] = 3
+    theirs["fields"]["pain"] = 9
+    theirs["gender"] = "Female"
+    mine["gender"] = "Other"
+    merged, conflicts = store.merge_records(BASE, mine, theirs)
+    assert merged["fields"]["pain"] == 3 and merged["gender"] == "Other"
+    assert sorted(conflicts) == ["fields.pain", "gender"]
+
+
+def test_deletion_on_one_side_wins_over_unchanged():
+    mine, theirs = copy(BASE), copy(BASE)
+    del theirs["fields"]["gh"]
+    merged, conflicts = store.merge_records(BASE, mine, theirs)
+    assert conflicts == [] and "gh" not in merged["fields"]
+
+
+def test_nested_findings_are_merged_by_key():
+    mine, theirs = copy(BASE), copy(BASE)
+    mine["findings"]["hpc"]["כאב בלילה"] = finding("כאב בלילה")
+    theirs["findings"]["hpc"]["כאב בבוקר"] = finding("כאב בבוקר")
+    theirs["findings"]["med"] = {"אקמול": finding("אקמול")}
+    merged, conflicts = store.merge_records(BASE, mine, theirs)
+    assert conflicts == []
+    assert set(merged["findings"]["hpc"]) == {"נפל במדרגות", "כאב בלילה", "כאב בבוקר"}
+    assert set(merged["findings"]["med"]) == {"אקמול"}
+
+
+def test_nested_findings_conflict_reports_full_path():
+    mine, theirs = copy(BASE), copy(BASE)
+    mine["findings"]["hpc"]["נפל במדרגות"]["n"] = 2
+    theirs["findings"]["hpc"]["נפל במדרגות"]["n"] = 3
+    merged, conflicts = store.merge_records(BASE, mine, theirs)
+    assert conflicts == ["findings.hpc.נפל במדרגות.n"]
+    assert merged["findings"]["hpc"]["נפל במדרגות"]["n"] == 2
+
+
+def test_two_connections_merge_instead_of_overwriting(tmp_path):
+    path = str(tmp_path / "clinic.db")
+    a, b = store.Store(path), store.Store(path)
+    a.save({"ת": {"profile": {}, "patients": {"מ": copy(BASE)}}})
+    pa, pb = a.load_patient("ת", "מ"), b.load_patient("ת", "מ")
+    pa["fields"]["gh"] = "סוכרת, לחץ דם"
+    pb["fields"]["pain"] = 7
+    a.save({"ת": {"patients": {"מ": pa}}})
+    merged = {}
+    b.save({"ת": {"patients": {"מ": pb}}}, merged)
+    assert merged[("ת", "מ")][1] == []
+    fields = store.Store(path).load_patient("ת", "מ")["fields"]
+    assert fields["gh"] == "סוכרת, לחץ דם" and fields["pain"] == 7
@@ -0,0 +1,52 @@
+# datacache.WriteBehind: איחוד כתיבות, וכתיבה שנכשלה חוזרת לתור ונכתבת בניסיון הבא
+import threading
+
+import pytest
+
+import datacache
+
+
+class FlakyWriter:
+    # נכשל ב-fail הקריאות הראשונות, ואחר כך שומר כל מה שנכתב
+    def __init__(self, fail=1):
+        self.fail = fail
+        self.calls = 0
+        self.written = []
+        self.done = threading.Event()
+
+    def __call__(self, marked, appended):
+        self.calls += 1
+        if self.calls <= self.fail: raise OSError("database is locked")
+        self.written.append((dict(marked), list(appended)))
+        appended.clear()
+        self.done.set()
+
+
+def test_marks_are_coalesced_into_one_write():
+    w = FlakyWriter(fail=0)
+    wb = datacache.WriteBehind(w, delay=0.05, max_delay=1.0)
+    for i in range(100): wb.mark("db", i)
+    assert w.done.wait(2)
+    assert w.written == [({"db": 99}, [])]
+
+
+def test_failed_flush_is_requeued_and_retried():
+    w = FlakyWriter(fail=1)
+    wb = datacache.WriteBehind(w, delay=0)
+    with pytest.raises(OSError):
+        wb.mark("db", 1)  # delay=0: כותב מיד, והכתיבה נכשלת
+    assert wb and wb.pending("db") == 1  # לא אבד - מחכה לניסיון הבא
+    wb.mark("db", 2)  # הערך החדש מחליף את זה שנכשל
+    assert w.written == [({"db": 2}, [])]
+    assert not wb
+
+
+def test_background_flush_retries_after_error():
+    w = FlakyWriter(fail=1)
+    wb = datacache.WriteBehind(w, delay=0.01, max_delay=0.05)
+    wb.mark("db", 1)
+    wb.append("utterance")
+    assert w.done.wait(2)
+    assert w.calls == 2
+    assert w.written == [({"db": 1}, ["utterance"])]
+    assert not wb
@@ -0,0 +1,180 @@
+# transcription.py - תור תמלול ברקע
+# הדף שולח הקלטה, מקבל מזהה עבודה וממשיך לעבוד; התוצאה נבדקת (poll) או נחכית (wait).
+# מנוע הזיהוי ניתן להחלפה: Google (ברירת מחדל) או מנוע מקומי לבדיקות בלי אינטרנט.
+import io
+import time
+import threading
+import importlib.util
+
+# הכנת אודיו (NumPy) - אופציונלי; בלעדיו ההקלטה נשלחת כמו שהיא.
+# NumPy כבד לייבוא, אז כאן רק בודקים שהוא מותקן - audio_prep נטען בהקלטה הראשונה
+HAS_PREP = importlib.util.find_spec("numpy") is not None
+
+PENDING, RUNNING, DONE, FAILED = "pending", "running", "done", "failed"
+
+
+class TranscriptionError(Exception):
+    pass
+
+
+class TransientError(TranscriptionError):
+    # תקלה זמנית (רשת, שרת עמוס) - שווה לנסות שוב
+    pass
+
+
+# --- מנועי זיהוי ---
+# מנוע = כל אובייקט עם recognize(audio_bytes, timeout) שמחזיר טקסט,
+# או None כשלא זוהו מילים, ומעלה TransientError/TranscriptionError בתקלה
+class GoogleRecognizer:
+    def __init__(self, language="he-IL"):
+        self.language = language
+
+    def recognize(self, audio_bytes, timeout=None):
+        import speech_recognition as sr
+        r = sr.Recognizer()
+        r.operation_timeout = timeout
+        try:
+            with sr.AudioFile(io.BytesIO(audio_bytes)) as source:
+                audio = r.record(source)
+        except (ValueError, EOFError) as e:
+            raise TranscriptionError(f"קובץ אודיו לא תקין: {e}")
+        try:
+            return r.recognize_google(audio, language=self.language)
+        except sr.UnknownValueError:
+            return None
+        except sr.RequestError as e:
+            raise TransientError(str(e))
+
+
+class OfflineRecognizer:
+    # מנוע מקומי לבדיקות: מחזיר טקסט קבוע (או תוצאה של פונקציה) אחרי השהייה אופציונלית
+    def __init__(self, text="כואב לי בברך ימין", delay=0.0):
+        self.text = text
+        self.delay = delay
+
+    def recognize(self, audio_bytes, timeout=None):
+        if self.delay:
+            if timeout is not None and self.delay > timeout: raise TransientError("timeout")
+            time.sleep(self.delay)
+        return self.text(audio_bytes) if callable(self.text) else self.text
+
+
+class PreprocessingRecognizer:
+    # עוטף מנוע אחר: מונו 16kHz, נרמול, חיתוך שקט ופיצול למקטעי דיבור -
+    # כל מקטע מזוהה בנפרד והטקסטים מחוברים. הקלטה בלי דיבור לא נשלחת בכלל
+    def __init__(self, inner, split=True):
+        self.inner = inner
+        self.split = split
+
+    def recognize(self, audio_bytes, timeout=None):
+        try:
+            import audio_prep
+            chunks = audio_prep.preprocess(audio_bytes, split=self.split)
+            if not self.split: chunks = [chunks] if chunks else []
+        except Exception:
+            chunks = [audio_bytes]  # פורמט שלא הצלחנו לפענח - שולחים כמו שהוא
+        deadline = time.time() + timeout if timeout is not None else None
+        texts = []
+        for chunk in chunks:
+            left = deadline - time.time() if deadline is not None else None
+            if left is not None and left <= 0: raise TransientError("timeout")
+            text = self.inner.recognize(chunk, timeout=left)
+            if text: texts.append(text)
+        return " ".join(texts) or None
+
+
+# --- עבודות ---
+class Job:
+    __slots__ = ("id", "state", "text", "error", "attempts", "submitted", "finished", "_done")
+
+    def __init__(self, job_id):
+        self.id = job_id
+        self.state = PENDING
+        self.text = None
+        self.error = None
+        self.attempts = 0
+        self.submitted = time.time()
+        self.finished = None
+        self._done = threading.Event()
+
+    @property
+    def done(self):
+        return self.state in (DONE, FAILED)
+
+
+class TranscriptionQueue:
+    # workers - כמה זיהויים רצים במקביל (לכל התהליך, כל הסשנים)
+    # timeout - זמן מקסימלי לעבודה כולה, כולל ניסיונות חוזרים - נספר מרגע שעובד לקח אותה
+    # (ההמתנה בתור לעובד פנוי לא נספרת, אחרת תור עמוס מכשיל הקלטות שעוד לא נשלחו)
+    # retries/backoff - ניסיונות חוזרים על תקלות זמניות, עם המתנה שמוכפלת בכל ניסיון
+    def __init__(self, recognizer, workers=2, timeout=30.0, retries=2, backoff=0.5, keep=500):
+        self.recognizer = recognizer
+        self.timeout = timeout
+        self.retries = retries
+        self.backoff = backoff
+        self.keep = keep
+        from concurrent.futures import ThreadPoolExecutor
+        self._pool = ThreadPoolExecutor(max_workers=workers, thread_name_prefix="transcribe")
+        self._jobs = {}
+        self._lock = threading.Lock()
+
+    def submit(self, audio_bytes, job_id=None, retry=False):
+        # אותו job_id (למשל hash של האודיו) שכבר בתור לא נשלח פעמיים.
+        # עבודה שנכשלה נשלחת שוב רק עם retry=True (המשתמש ביקש)
+        if not job_id:
+            import uuid
+            job_id = uuid.uuid4().hex
+        with self._lock:
+            job = self._jobs.get(job_id)
+            if job and not (retry and job.state == FAILED): return job_id
+            job = self._jobs[job_id] = Job(job_id)
+            self._trim()
+        self._pool.submit(self._run, job, audio_bytes)
+        return job_id
+
+    def get(self, job_id):
+        with self._lock: return self._jobs.get(job_id)
+
+    def wait(self, job_id, timeout=None):
+        job = self.get(job_id)
+        if job: job._done.wait(timeout)
+        return job
+
+    def _trim(self):
+        # שומרים רק את העבודות האחרונות שהסתיימו
+        finished = [j for j in self._jobs.values() if j.done]
+        for j in sorted(finished, key=lambda j: j.finished)[:max(0, len(finished) - self.keep)]:
+            del self._jobs[j.id]
+
+    def _run(self, job, audio_bytes):
+        job.state = RUNNING
+        deadline = time.time() + self.timeout
+        delay = self.backoff
+        while True:
+            job.attempts += 1
+            left = deadline - time.time()
+            try:
+                if left <= 0: raise TranscriptionError("תם הזמן לתמלול")
+                job.text = self.recognizer.recognize(audio_bytes, timeout=left)
+                state = DONE
+                break
+            except TransientError as e:
+                job.error = str(e)
+                if job.attempts > self.retries or time.time() + delay >= deadline:
+                    state = FAILED
+                    break
+                time.sleep(delay)
+                delay *= 2
+            except Exception as e:
+                job.error = str(e)
+                state = FAILED
+                break
+        # המצב הסופי והזמן נקבעים יחד, תחת הנעילה - _trim (מ-submit) לא יראה עבודה
+        # שהסתיימה בלי finished
+        with self._lock:
+            job.finished = time.time()
+            job.state = state
+        job._done.set()
+
+    def shutdown(self, wait=True):
+        self._pool.shutdown(wait=wait)